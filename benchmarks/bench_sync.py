@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""Sync throughput benchmarks.
+
+Measures, at each data size:
+
+  flatten       JSON record -> row tuple conversion used by Database.upsert_*
+  sqlite_write  Database.upsert_* in API-sized pages, first write and unchanged rewrite
+  sync_all      WhoopSync.sync_all(full_sync=True) against the local fake API
+
+Every case runs in a fresh process so peak RSS is per case. Results are
+written as JSON; pass --compare to diff against an earlier run.
+
+    python benchmarks/bench_sync.py --years 1,5,10
+    python benchmarks/bench_sync.py --compare benchmarks/results/<previous>.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.whoop_sync import db as dbmod  # noqa: E402
+from src.whoop_sync.config import config  # noqa: E402
+from src.whoop_sync.synthetic import generate_user, ENTITY_TYPES  # noqa: E402
+
+ROW_BUILDERS = {
+    "cycles": dbmod._cycle_row,
+    "recoveries": dbmod._recovery_row,
+    "sleeps": dbmod._sleep_row,
+    "workouts": dbmod._workout_row,
+}
+
+PAGE_SIZE = 25
+SEED = 42
+# Pinned here too, so the dataset stays the same if the generator's default moves.
+END = datetime(2026, 1, 1)
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _result(stage: str, years: int, records: int, pages: int, seconds: float, **extra) -> dict:
+    return {
+        "stage": stage,
+        "years": years,
+        "records": records,
+        "pages": pages,
+        "seconds": round(seconds, 4),
+        "records_per_sec": round(records / seconds, 1) if seconds else None,
+        "pages_per_sec": round(pages / seconds, 1) if seconds else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        **extra,
+    }
+
+
+def _pages(records: list):
+    for i in range(0, len(records), PAGE_SIZE):
+        yield records[i : i + PAGE_SIZE]
+
+
+def bench_flatten(years: int, repeat: int = 5) -> dict:
+    data = generate_user(1, years * 365, SEED, END)
+    total = sum(len(data[label]) for label in ENTITY_TYPES)
+    pages = sum(len(list(_pages(data[label]))) for label in ENTITY_TYPES)
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for label in ENTITY_TYPES:
+            build = ROW_BUILDERS[label]
+            for record in data[label]:
+                build(record)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return _result("flatten", years, total, pages, best)
+
+
+def bench_sqlite_write(years: int) -> dict:
+    data = generate_user(1, years * 365, SEED, END)
+    total = sum(len(data[label]) for label in ENTITY_TYPES)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = dbmod.Database(os.path.join(tmp, "bench.db"))
+        upserts = {
+            "cycles": db.upsert_cycles,
+            "recoveries": db.upsert_recoveries,
+            "sleeps": db.upsert_sleeps,
+            "workouts": db.upsert_workouts,
+        }
+
+        def write_all() -> tuple:
+            pages = written = 0
+            started = time.perf_counter()
+            for label in ENTITY_TYPES:
+                for page in _pages(data[label]):
+                    written += upserts[label](page)
+                    pages += 1
+            return time.perf_counter() - started, pages, written
+
+        first, pages, written = write_all()
+        # Same records again: exercises the skip-unchanged path of a re-sync.
+        rewrite, _, rewritten = write_all()
+        db.close()
+
+    return _result(
+        "sqlite_write",
+        years,
+        total,
+        pages,
+        first,
+        rows_written=written,
+        rewrite_seconds=round(rewrite, 4),
+        rewrite_records_per_sec=round(total / rewrite, 1),
+        rewrite_rows_written=rewritten,
+    )
+
+
+def bench_sync_all(years: int, base_url: str, parallel: int) -> dict:
+    from src.whoop_sync.sync import WhoopSync
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config.api_base_url = base_url
+        config.token_url = f"{base_url}/oauth/oauth2/token"
+        config.db_path = os.path.join(tmp, "bench.db")
+        config.tokens_file = os.path.join(tmp, "tokens.json")
+        config.archive_dir = ""
+        # The fake server has no quota; don't let the client-side limiter
+        # turn this into a benchmark of time.sleep.
+        config.rate_limit_per_minute = 1_000_000
+        config.rate_limit_per_day = 1_000_000_000
+        with open(config.tokens_file, "w") as f:
+            json.dump(
+                {"access_token": "bench", "refresh_token": "bench", "expires_at": time.time() + 86400},
+                f,
+            )
+
+        sync = WhoopSync()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                sync.authenticate()
+                sync.start_run("bench")
+                started = time.perf_counter()
+                sync.sync_all(full_sync=True, parallel=parallel)
+                elapsed = time.perf_counter() - started
+                sync.metrics.finish("ok")
+            totals = sync.metrics.totals()
+        finally:
+            sync.close()
+
+    return _result(
+        "sync_all",
+        years,
+        totals.rows_written + totals.rows_skipped,
+        totals.pages,
+        elapsed,
+        parallel=parallel,
+        requests=totals.requests,
+        bytes_received=totals.bytes_received,
+        http_seconds=round(totals.http_seconds, 4),
+        db_seconds=round(totals.db_seconds, 4),
+    )
+
+
+def _isolated(fn, *args) -> dict:
+    # A fresh interpreter per case keeps ru_maxrss meaningful.
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _case_key(result: dict) -> tuple:
+    return (result["stage"], result["years"], result.get("parallel"))
+
+
+def compare(previous_path: str, results: list):
+    with open(previous_path) as f:
+        previous = {_case_key(r): r for r in json.load(f)["results"]}
+    print(f"\nCompared with {previous_path}:")
+    for result in results:
+        old = previous.get(_case_key(result))
+        if not old or not old.get("records_per_sec"):
+            continue
+        change = result["records_per_sec"] / old["records_per_sec"] - 1
+        print(
+            f"  {result['stage']:<13} {result['years']:>3}y  "
+            f"{old['records_per_sec']:>12,.0f} -> {result['records_per_sec']:>12,.0f} rec/s "
+            f"({change:+.1%})"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sync throughput")
+    parser.add_argument("--years", default="1,5,10", help="Comma-separated data sizes")
+    parser.add_argument(
+        "--stages", default="flatten,sqlite_write,sync_all", help="Comma-separated stages"
+    )
+    parser.add_argument("--parallel", type=int, default=4, help="Streams for sync_all")
+    parser.add_argument("--output", help="Result file (default benchmarks/results/<time>-<rev>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(y) for y in args.years.split(",")]
+    stages = args.stages.split(",")
+    results = []
+
+    for years in sizes:
+        if "flatten" in stages:
+            results.append(_isolated(bench_flatten, years))
+        if "sqlite_write" in stages:
+            results.append(_isolated(bench_sqlite_write, years))
+        if "sync_all" in stages:
+            from src.whoop_sync.fake_server import FakeDataset, load_spec, start_server
+
+            spec = load_spec()
+            server = start_server(
+                port=0, dataset=FakeDataset(spec, generate_user(1, years * 365, SEED, END)), spec=spec
+            )
+            try:
+                base_url = f"http://127.0.0.1:{server.server_port}"
+                results.append(_isolated(bench_sync_all, years, base_url, args.parallel))
+            finally:
+                server.shutdown()
+                server.server_close()
+
+        for result in results[-len(stages):]:
+            print(
+                f"{result['stage']:<13} {result['years']:>3}y  {result['records']:>8} records  "
+                f"{result['records_per_sec']:>12,.0f} rec/s  {result['pages_per_sec']:>9,.1f} pages/s  "
+                f"{result['peak_rss_mb']:>7.1f} MB"
+            )
+
+    revision = _git_revision()
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"{datetime.now():%Y%m%d-%H%M%S}-{revision}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(
+            {
+                "revision": revision,
+                "created_at": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "sqlite": dbmod.sqlite3.sqlite_version,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,10 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import sqlite3
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import numpy as np
 import os
+from src.whoop_sync.db import ROLLUP_METRICS, Database, connect_readonly, period_start
 from src.whoop_sync.mlr import (
     prepare_recovery_mlr_data,
     prepare_hrv_mlr_data,
@@ -22,49 +22,116 @@ DB_PATH = os.getenv("WHOOP_DB_PATH", "whoop.db")
 
 
 @st.cache_resource
+def upgrade_database():
+    # Connections below are read-only; let the writer side add any columns
+    # an older database is missing, once per server process.
+    Database(DB_PATH).close()
+
+
 def get_connection():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+    # One read-only connection per browser session, so sessions don't queue
+    # on a shared connection and never block a running sync.
+    if "db_conn" not in st.session_state:
+        st.session_state.db_conn = connect_readonly(DB_PATH)
+    return st.session_state.db_conn
+
+
+def load_bounds():
+    conn = get_connection()
+    min_day, max_day, total_cycles = conn.execute(
+        "SELECT MIN(day), MAX(day), COUNT(*) FROM cycles"
+    ).fetchone()
+    total_workouts = conn.execute("SELECT COUNT(*) FROM workouts").fetchone()[0]
+    return min_day, max_day, total_cycles, total_workouts
 
 
-def load_data():
+def load_data(start_date, end_date):
+    # The date filter runs in SQLite on the indexed local day columns.
     conn = get_connection()
+    days = (start_date.isoformat(), end_date.isoformat())
 
-    cycles = pd.read_sql("SELECT * FROM cycles ORDER BY start DESC", conn)
-    recoveries = pd.read_sql("SELECT * FROM recoveries ORDER BY updated_at DESC", conn)
-    sleeps = pd.read_sql("SELECT * FROM sleeps ORDER BY start DESC", conn)
-    workouts = pd.read_sql("SELECT * FROM workouts ORDER BY start DESC", conn)
+    cycles = pd.read_sql(
+        "SELECT * FROM cycles WHERE day BETWEEN ? AND ? ORDER BY start_ms DESC",
+        conn,
+        params=days,
+    )
+    recoveries = pd.read_sql(
+        """
+        SELECT r.* FROM recoveries r
+        JOIN cycles c ON c.id = r.cycle_id
+        WHERE c.day BETWEEN ? AND ?
+        ORDER BY r.updated_at DESC
+        """,
+        conn,
+        params=days,
+    )
+    sleeps = pd.read_sql(
+        "SELECT * FROM sleeps WHERE day BETWEEN ? AND ? ORDER BY start_ms DESC",
+        conn,
+        params=days,
+    )
+    workouts = pd.read_sql(
+        "SELECT * FROM workouts WHERE day BETWEEN ? AND ? ORDER BY start_ms DESC",
+        conn,
+        params=days,
+    )
+    facts = pd.read_sql(
+        "SELECT * FROM daily_facts WHERE day BETWEEN ? AND ? ORDER BY day",
+        conn,
+        params=days,
+    )
     profile = pd.read_sql("SELECT * FROM user_profile", conn)
     body = pd.read_sql("SELECT * FROM body_measurement", conn)
 
-    return cycles, recoveries, sleeps, workouts, profile, body
-
+    for df in (cycles, sleeps, workouts, facts):
+        df["date"] = df["day"]
+
+    return cycles, recoveries, sleeps, workouts, facts, profile, body
+
+
+def pick_resolution(start_date, end_date):
+    # Keep long ranges to a few hundred points per trace.
+    days = (end_date - start_date).days
+    if days <= 120:
+        return "day"
+    if days <= 730:
+        return "week"
+    return "month"
+
+
+def load_rollups(resolution, start_date, end_date):
+    """Per-period means of each metric, shaped like daily_facts with date = period."""
+    rollups = pd.read_sql(
+        """
+        SELECT period, metric, mean FROM rollups
+        WHERE resolution = ? AND period BETWEEN ? AND ?
+        """,
+        get_connection(),
+        params=(
+            resolution,
+            period_start(resolution, start_date.isoformat()),
+            end_date.isoformat(),
+        ),
+    )
+    trend = rollups.pivot_table(index="period", columns="metric", values="mean").reindex(
+        columns=list(ROLLUP_METRICS)
+    )
+    return trend.reset_index().rename(columns={"period": "date"})
 
-def parse_datetime(df, columns):
-    for col in columns:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col].str.replace("Z", "+00:00"), utc=True)
-    return df
 
+if not os.path.exists(DB_PATH):
+    st.warning("No database found. Run `python main.py sync` to fetch your data.")
+    st.stop()
 
-cycles, recoveries, sleeps, workouts, profile, body = load_data()
+upgrade_database()
+min_day, max_day, total_cycles, total_workouts = load_bounds()
 
-if cycles.empty:
+if not total_cycles:
     st.warning("No data found. Run `python main.py sync` to fetch your data.")
     st.stop()
 
-cycles = parse_datetime(cycles, ["start", "end", "created_at", "updated_at"])
-sleeps = parse_datetime(sleeps, ["start", "end", "created_at", "updated_at"])
-workouts = parse_datetime(workouts, ["start", "end", "created_at", "updated_at"])
-recoveries["updated_at"] = pd.to_datetime(
-    recoveries["updated_at"].str.replace("Z", "+00:00"), utc=True
-)
-
-cycles["date"] = cycles["start"].dt.date
-sleeps["date"] = sleeps["start"].dt.date
-workouts["date"] = workouts["start"].dt.date
-
-min_date = cycles["date"].min()
-max_date = cycles["date"].max()
+min_date = date.fromisoformat(min_day)
+max_date = date.fromisoformat(max_day)
 
 default_start = max(min_date, max_date - timedelta(days=30))
 
@@ -82,12 +149,21 @@ else:
     start_date = date_range[0]
     end_date = max_date
 
-cycles_filtered = cycles[(cycles["date"] >= start_date) & (cycles["date"] <= end_date)]
-recoveries_filtered = recoveries[recoveries["cycle_id"].isin(cycles_filtered["id"])]
-sleeps_filtered = sleeps[(sleeps["date"] >= start_date) & (sleeps["date"] <= end_date)]
-workouts_filtered = workouts[
-    (workouts["date"] >= start_date) & (workouts["date"] <= end_date)
-]
+(
+    cycles_filtered,
+    recoveries_filtered,
+    sleeps_filtered,
+    workouts_filtered,
+    facts_filtered,
+    profile,
+    body,
+) = load_data(start_date, end_date)
+
+resolution = pick_resolution(start_date, end_date)
+if resolution == "day":
+    trend = facts_filtered
+else:
+    trend = load_rollups(resolution, start_date, end_date)
 
 if not profile.empty:
     st.sidebar.markdown(
@@ -102,8 +178,10 @@ if not body.empty:
 
 st.sidebar.markdown("---")
 st.sidebar.markdown(f"**Data Range:** {min_date} to {max_date}")
-st.sidebar.markdown(f"**Total Cycles:** {len(cycles)}")
-st.sidebar.markdown(f"**Total Workouts:** {len(workouts)}")
+st.sidebar.markdown(f"**Total Cycles:** {total_cycles}")
+st.sidebar.markdown(f"**Total Workouts:** {total_workouts}")
+if resolution != "day":
+    st.sidebar.markdown(f"**Charts:** {resolution}ly averages")
 
 st.header("Overview")
 col1, col2, col3, col4, col5, col6 = st.columns(6)
@@ -149,18 +227,7 @@ tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(
 )
 
 with tab1:
-    df_merged = (
-        cycles_filtered[["date", "strain", "id"]]
-        .merge(
-            recoveries_filtered[
-                ["cycle_id", "recovery_score", "resting_heart_rate", "hrv_rmssd_milli"]
-            ],
-            left_on="id",
-            right_on="cycle_id",
-            how="left",
-        )
-        .sort_values("date")
-    )
+    df_merged = trend
 
     fig = make_subplots(
         rows=2,
@@ -196,15 +263,26 @@ with tab1:
     st.plotly_chart(fig, use_container_width=True)
 
 with tab2:
-    sleep_df = sleeps_filtered.sort_values("date")
-
-    sleep_df["light_hrs"] = sleep_df["total_light_sleep_time_milli"] / 3600000
-    sleep_df["deep_hrs"] = sleep_df["total_slow_wave_sleep_time_milli"] / 3600000
-    sleep_df["rem_hrs"] = sleep_df["total_rem_sleep_time_milli"] / 3600000
-    sleep_df["awake_hrs"] = sleep_df["total_awake_time_milli"] / 3600000
-    sleep_df["total_sleep_hrs"] = (
-        sleep_df["light_hrs"] + sleep_df["deep_hrs"] + sleep_df["rem_hrs"]
-    )
+    if resolution == "day":
+        sleep_df = sleeps_filtered.sort_values("date")
+
+        sleep_df["light_hrs"] = sleep_df["total_light_sleep_time_milli"] / 3600000
+        sleep_df["deep_hrs"] = sleep_df["total_slow_wave_sleep_time_milli"] / 3600000
+        sleep_df["rem_hrs"] = sleep_df["total_rem_sleep_time_milli"] / 3600000
+        sleep_df["awake_hrs"] = sleep_df["total_awake_time_milli"] / 3600000
+        sleep_df["total_sleep_hrs"] = (
+            sleep_df["light_hrs"] + sleep_df["deep_hrs"] + sleep_df["rem_hrs"]
+        )
+    else:
+        # Rollups cover main sleeps only; naps are left out of the averages.
+        sleep_df = trend.rename(
+            columns={
+                "light_sleep_hrs": "light_hrs",
+                "deep_sleep_hrs": "deep_hrs",
+                "rem_sleep_hrs": "rem_hrs",
+            }
+        )
+        sleep_df["awake_hrs"] = sleep_df["awake_min"] / 60
 
     st.subheader("Sleep Stages Breakdown")
 
@@ -284,15 +362,7 @@ with tab2:
     st.plotly_chart(fig_perf, use_container_width=True)
 
 with tab3:
-    df_hr_base = cycles_filtered[
-        ["date", "average_heart_rate", "max_heart_rate", "id"]
-    ].sort_values("date")
-    df_recovery_hr = recoveries_filtered[
-        ["cycle_id", "resting_heart_rate", "hrv_rmssd_milli"]
-    ]
-    df_hr = df_hr_base.merge(
-        df_recovery_hr, left_on="id", right_on="cycle_id", how="left"
-    )
+    df_hr = trend
 
     fig = make_subplots(
         rows=2,
@@ -358,9 +428,7 @@ with tab4:
         st.subheader("Workout History")
 
         workout_df = workouts_filtered.copy()
-        workout_df["duration_min"] = (
-            workout_df["end"] - workout_df["start"]
-        ).dt.total_seconds() / 60
+        workout_df["duration_min"] = (workout_df["end_ms"] - workout_df["start_ms"]) / 60000
 
         col1, col2 = st.columns(2)
         with col1:
@@ -413,45 +481,7 @@ with tab4:
 with tab5:
     st.subheader("Data Correlations & Insights")
 
-    df_insights = (
-        cycles_filtered[["date", "strain", "id", "kilojoule"]]
-        .merge(
-            recoveries_filtered[
-                ["cycle_id", "recovery_score", "resting_heart_rate", "hrv_rmssd_milli"]
-            ],
-            left_on="id",
-            right_on="cycle_id",
-            how="left",
-        )
-        .merge(
-            sleeps_filtered[
-                [
-                    "cycle_id",
-                    "sleep_performance_percentage",
-                    "sleep_efficiency_percentage",
-                    "total_light_sleep_time_milli",
-                    "total_slow_wave_sleep_time_milli",
-                    "total_rem_sleep_time_milli",
-                    "total_awake_time_milli",
-                ]
-            ],
-            left_on="id",
-            right_on="cycle_id",
-            how="left",
-        )
-    )
-
-    df_insights["sleep_hrs"] = (
-        df_insights["total_light_sleep_time_milli"].fillna(0)
-        + df_insights["total_slow_wave_sleep_time_milli"].fillna(0)
-        + df_insights["total_rem_sleep_time_milli"].fillna(0)
-    ) / 3600000
-
-    df_insights["deep_sleep_hrs"] = (
-        df_insights["total_slow_wave_sleep_time_milli"] / 3600000
-    )
-    df_insights["rem_sleep_hrs"] = df_insights["total_rem_sleep_time_milli"] / 3600000
-    df_insights["awake_min"] = df_insights["total_awake_time_milli"] / 60000
+    df_insights = facts_filtered.rename(columns={"total_sleep_hrs": "sleep_hrs"})
 
     st.markdown("### Correlation Matrix")
     corr_cols = [
@@ -631,8 +661,7 @@ with tab5:
     st.markdown("### Workout Impact Analysis")
 
     if not workouts_filtered.empty:
-        workout_dates = set(workouts_filtered["date"])
-        df_insights["had_workout"] = df_insights["date"].isin(workout_dates)
+        df_insights["had_workout"] = df_insights["workout_count"] > 0
 
         workout_days = df_insights[df_insights["had_workout"]]
         rest_days = df_insights[~df_insights["had_workout"]]
@@ -679,9 +708,7 @@ with tab6:
     The timeline below shows how well the model tracks actual recovery over time.
     """)
 
-    df_mlr = prepare_recovery_mlr_data(
-        cycles_filtered, recoveries_filtered, sleeps_filtered, workouts_filtered
-    )
+    df_mlr = prepare_recovery_mlr_data(facts_filtered)
 
     ridge_rec = fit_recovery_ridge_model(df_mlr)
 
@@ -823,9 +850,7 @@ with tab7:
     The timeline below shows how well the model tracks actual HRV over time.
     """)
 
-    df_mlr_hrv = prepare_hrv_mlr_data(
-        cycles_filtered, recoveries_filtered, sleeps_filtered, workouts_filtered
-    )
+    df_mlr_hrv = prepare_hrv_mlr_data(facts_filtered)
 
     ridge_hrv = fit_hrv_ridge_model(df_mlr_hrv)
 
@@ -1,6 +1,7 @@
 #!/bin/bash
 set -e
 
+SYNC_MODE=${SYNC_MODE:-daemon}
 SYNC_HOUR=${SYNC_HOUR:-11}
 SYNC_MINUTE=${SYNC_MINUTE:-0}
 TOKENS_FILE=${WHOOP_TOKENS_FILE:-/app/data/tokens.json}
@@ -8,26 +9,37 @@ TOKENS_FILE=${WHOOP_TOKENS_FILE:-/app/data/tokens.json}
 echo "========================================"
 echo "Whoop Sync Container Starting"
 echo "========================================"
-echo "Sync scheduled daily at $SYNC_HOUR:$(printf '%02d' $SYNC_MINUTE)"
+if [ "$SYNC_MODE" = "cron" ]; then
+    echo "Sync scheduled daily at $SYNC_HOUR:$(printf '%02d' $SYNC_MINUTE)"
+else
+    echo "Sync daemon polling every ${WHOOP_DAEMON_INTERVAL:-900}s"
+fi
 echo "Timezone: ${TZ:-UTC}"
 echo "Tokens file: $TOKENS_FILE"
 echo "========================================"
 
-# Export all environment variables so cron can source them.
-# Cron runs in a minimal environment and does NOT inherit container env vars.
-env | grep -v -E '^(HOSTNAME|TERM|SHLVL|_)=' > /app/.env.cron 2>/dev/null || true
+if [ "$SYNC_MODE" = "cron" ]; then
+    # Export all environment variables so cron can source them.
+    # Cron runs in a minimal environment and does NOT inherit container env vars.
+    env | grep -v -E '^(HOSTNAME|TERM|SHLVL|_)=' > /app/.env.cron 2>/dev/null || true
 
-# Build cron job. Output goes to Docker stdout/stderr via /proc/1/fd/*.
-cat > /etc/cron.d/whoop-cron <<CRON_EOF
+    # Build cron job. Output goes to Docker stdout/stderr via /proc/1/fd/*.
+    cat > /etc/cron.d/whoop-cron <<CRON_EOF
 ${SYNC_MINUTE} ${SYNC_HOUR} * * * root cd /app && set -a && . /app/.env.cron && set +a && PYTHONPATH=/app python main.py sync >> /proc/1/fd/1 2>> /proc/1/fd/2
 CRON_EOF
-chmod 0644 /etc/cron.d/whoop-cron
+    chmod 0644 /etc/cron.d/whoop-cron
 
-# Start cron daemon
-cron
+    # Start cron daemon
+    cron
 
-echo "Cron daemon started. Verifying..."
-crontab -l
+    echo "Cron daemon started. Verifying..."
+    crontab -l
+else
+    # Resident sync process: warm DB connection and HTTP pool, polls on an
+    # interval, serves /health and /stats on WHOOP_DAEMON_PORT.
+    cd /app && python main.py daemon &
+    echo "Sync daemon started (pid $!)"
+fi
 echo "========================================"
 
 echo ""
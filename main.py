@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
 from datetime import datetime
 import sys
 import os
@@ -14,7 +15,17 @@ def main():
     )
     parser.add_argument(
         "command",
-        choices=["auth", "sync", "stats", "status", "reauth"],
+        choices=[
+            "auth",
+            "sync",
+            "accounts",
+            "daemon",
+            "repair",
+            "replay",
+            "stats",
+            "status",
+            "reauth",
+        ],
         help="Command to run",
     )
     parser.add_argument(
@@ -27,6 +38,59 @@ def main():
         type=str,
         help="Data types to sync (comma-separated: cycles,recoveries,sleeps,workouts)",
     )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        help="Number of entity streams to fetch concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="With --full, split the range into time windows fetched concurrently",
+    )
+    parser.add_argument(
+        "--registry",
+        type=str,
+        help=f"With accounts, the account registry JSON (default: {config.accounts_file})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help=f"With accounts, accounts synced at once (default: {config.account_workers})",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        help=f"With daemon, seconds between polls (default: {config.daemon_interval:.0f})",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Discard checkpoints from an interrupted sync and start over",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="With replay, rewrite rows even when updated_at has not changed",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        type=str,
+        help="Write the sync run report as JSON to this path",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        type=str,
+        help="Write sync metrics in Prometheus textfile format to this path",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Drive all entity streams from one asyncio event loop",
+    )
     parser.add_argument(
         "--timeout",
         type=int,
@@ -75,7 +139,7 @@ def main():
 
         elif args.command == "status":
             print("Authentication Status:")
-            print(f"  Tokens file: {config.tokens_file}")
+            print(f"  Tokens file: {sync.auth.tokens_file}")
             if sync.auth.load_tokens():
                 print(
                     f"  Has access token: {'Yes' if sync.auth.access_token else 'No'}"
@@ -119,26 +183,131 @@ def main():
             if args.end:
                 end = datetime.strptime(args.end, "%Y-%m-%d")
 
-            if args.types:
-                types = args.types.split(",")
-                if "cycles" in types:
-                    sync.sync_cycles(start=start, end=end, full_sync=args.full)
-                if "recoveries" in types:
-                    sync.sync_recoveries(start=start, end=end, full_sync=args.full)
-                if "sleeps" in types:
-                    sync.sync_sleeps(start=start, end=end, full_sync=args.full)
-                if "workouts" in types:
-                    sync.sync_workouts(start=start, end=end, full_sync=args.full)
-            else:
-                sync.sync_all(full_sync=args.full, start=start, end=end)
+            if args.no_resume:
+                sync.db.clear_sync_state()
+
+            sync.start_run("sync --full" if args.full else "sync")
+            try:
+                if args.use_async:
+                    asyncio.run(
+                        sync.sync_all_async(
+                            full_sync=args.full,
+                            start=start,
+                            end=end,
+                            types=args.types.split(",") if args.types else None,
+                        )
+                    )
+                elif args.types:
+                    sync.sync_types(
+                        args.types.split(","),
+                        full_sync=args.full,
+                        start=start,
+                        end=end,
+                        parallel=args.parallel,
+                        shards=args.shards,
+                    )
+                else:
+                    sync.sync_all(
+                        full_sync=args.full,
+                        start=start,
+                        end=end,
+                        parallel=args.parallel,
+                        shards=args.shards,
+                    )
+            except BaseException:
+                sync.finish_run("failed", args.metrics_json, args.metrics_textfile)
+                raise
+            sync.finish_run("ok", args.metrics_json, args.metrics_textfile)
 
             print("\nSync complete!")
 
+        elif args.command == "accounts":
+            from src.whoop_sync.accounts import AccountOrchestrator, load_registry
+
+            accounts = load_registry(args.registry)
+            orchestrator = AccountOrchestrator(
+                accounts, workers=args.workers, parallel=args.parallel
+            )
+            summary = orchestrator.run(
+                full_sync=args.full, report_path=args.metrics_json
+            )
+            print(
+                f"\nSynced {summary['accounts']} accounts in {summary['wall_seconds']:.1f}s: "
+                + ", ".join(f"{n} {status}" for status, n in summary["statuses"].items())
+            )
+            if summary["statuses"].get("ok", 0) < summary["accounts"]:
+                sys.exit(1)
+
+        elif args.command == "daemon":
+            from src.whoop_sync.daemon import SyncDaemon
+
+            events = None
+            if config.webhook_port:
+                from src.whoop_sync.webhooks import EventQueue, start_webhook_server
+
+                events = EventQueue()
+                try:
+                    webhook_server = start_webhook_server(events)
+                except ValueError as e:
+                    print(f"Error: {e}")
+                    sys.exit(1)
+                host, port = webhook_server.server_address[:2]
+                print(f"Webhook receiver on http://{host}:{port}/webhook")
+
+            daemon = SyncDaemon(
+                sync, interval=args.interval, parallel=args.parallel, events=events
+            )
+            server = daemon.start_status_server()
+            host, port = server.server_address[:2]
+            print(f"Status endpoint on http://{host}:{port}/health and /stats")
+            daemon.run()
+
+        elif args.command == "repair":
+            print("Authenticating...")
+            if not sync.authenticate():
+                print("No valid tokens or authentication failed.")
+                print("Run: docker exec whoop-dashboard python main.py auth")
+                sys.exit(1)
+
+            sync.start_run("repair")
+            try:
+                sync.repair(workers=max(args.parallel, 4))
+            except BaseException:
+                sync.finish_run("failed", args.metrics_json, args.metrics_textfile)
+                raise
+            sync.finish_run("ok", args.metrics_json, args.metrics_textfile)
+            print("\nRepair complete!")
+
+        elif args.command == "replay":
+            print(f"Replaying archive {config.archive_dir} into {config.db_path}...")
+            sync.replay(
+                types=args.types.split(",") if args.types else None, force=args.force
+            )
+            print("\nReplay complete!")
+
         elif args.command == "stats":
             stats = sync.db.get_stats()
+            marks = sync.db.get_watermarks()
             print("Database statistics:")
             for table, count in stats.items():
-                print(f"  {table}: {count} records")
+                mark = marks.get(table)
+                if mark:
+                    print(
+                        f"  {table}: {count} records "
+                        f"(newest start {mark['max_start']}, last update {mark['max_updated_at']})"
+                    )
+                else:
+                    print(f"  {table}: {count} records")
+
+            runs = sync.db.get_sync_runs(5)
+            if runs:
+                print("\nRecent sync runs:")
+                for run in runs:
+                    print(
+                        f"  {run['started_at']} {run['mode']}: {run['status']} in "
+                        f"{run['wall_seconds']:.1f}s, {run['requests']} requests, "
+                        f"{run['rows_written']} written, {run['rows_skipped']} unchanged"
+                    )
 
     finally:
         sync.close()
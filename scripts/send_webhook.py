@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Post fake Whoop webhook events to a local receiver (main.py daemon with
+WHOOP_WEBHOOK_PORT set).
+
+    python scripts/send_webhook.py sleep.updated <sleep-id>
+    python scripts/send_webhook.py workout.updated <id> --repeat 5   # coalesced into one fetch
+    python scripts/send_webhook.py recovery.updated <sleep-id> --secret "$WHOOP_WEBHOOK_SECRET"
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.whoop_sync.config import config  # noqa: E402
+from src.whoop_sync.webhooks import sign  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send a fake Whoop webhook event")
+    parser.add_argument("type", help="e.g. sleep.updated, workout.deleted, recovery.updated")
+    parser.add_argument("id", help="Record id (sleep id for recovery events)")
+    parser.add_argument(
+        "--url",
+        default=f"http://localhost:{config.webhook_port or 8082}/webhook",
+        help="Receiver URL",
+    )
+    parser.add_argument("--secret", default=config.webhook_secret, help="Signing secret")
+    parser.add_argument("--user-id", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="Send the event this many times")
+    args = parser.parse_args()
+
+    body = json.dumps(
+        {"user_id": args.user_id, "id": args.id, "type": args.type, "trace_id": os.urandom(8).hex()}
+    ).encode()
+    for _ in range(args.repeat):
+        headers = {"Content-Type": "application/json"}
+        if args.secret:
+            timestamp = str(int(time.time() * 1000))
+            headers["X-WHOOP-Signature-Timestamp"] = timestamp
+            headers["X-WHOOP-Signature"] = sign(args.secret, timestamp, body)
+        response = requests.post(args.url, data=body, headers=headers, timeout=10)
+        print(f"{args.type} {args.id}: {response.status_code} {response.text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .config import config
+from .metrics import _atomic_write
+from .ratelimit import RequestScheduler
+from .sync import WhoopSync
+
+
+@dataclass
+class Account:
+    """One registry entry.
+
+    Each account has its own tokens file. Give it its own db_path, or share a
+    db_path between accounts and set user_id so each syncs its own partition.
+    Raw pages are archived under archive_dir, by default a directory named
+    after the account inside WHOOP_ARCHIVE_DIR, so replay restores only that
+    account's records.
+    """
+
+    name: str
+    tokens_file: str
+    db_path: Optional[str] = None
+    user_id: Optional[int] = None
+    rate_limit_per_minute: Optional[int] = None
+    rate_limit_per_day: Optional[int] = None
+    archive_dir: Optional[str] = None
+
+    @property
+    def run_mode(self) -> str:
+        return f"accounts:{self.name}"
+
+    @property
+    def archive_root(self) -> str:
+        if self.archive_dir:
+            return self.archive_dir
+        # "" disables archiving, as WHOOP_ARCHIVE_DIR does.
+        return os.path.join(config.archive_dir, self.name) if config.archive_dir else ""
+
+
+def load_registry(path: str = None) -> List[Account]:
+    """Read accounts from JSON: {"accounts": [{"name": ..., "tokens_file": ...}]}.
+
+    Relative paths are resolved against the registry's directory.
+    """
+    path = path or config.accounts_file
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path) as f:
+        entries = json.load(f)["accounts"]
+
+    accounts = []
+    for entry in entries:
+        account = Account(**entry)
+        account.tokens_file = os.path.join(base, account.tokens_file)
+        if account.db_path:
+            account.db_path = os.path.join(base, account.db_path)
+        if account.archive_dir:
+            account.archive_dir = os.path.join(base, account.archive_dir)
+        accounts.append(account)
+
+    names = [a.name for a in accounts]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate account names in {path}")
+    shared = {}
+    for account in accounts:
+        shared.setdefault(account.db_path or config.db_path, []).append(account)
+    for db_path, group in shared.items():
+        if len(group) > 1 and any(a.user_id is None for a in group):
+            raise ValueError(f"Accounts sharing {db_path} must each set user_id")
+    return accounts
+
+
+class AccountOrchestrator:
+    def __init__(self, accounts: List[Account], workers: int = None, parallel: int = 1):
+        self.accounts = accounts
+        self.workers = workers or config.account_workers
+        self.parallel = parallel
+        self.results = {}
+        self._lock = threading.Lock()
+        self._started = None
+
+    def _last_success(self, account: Account) -> str:
+        sync = WhoopSync(account.tokens_file, account.db_path, account.user_id)
+        try:
+            return sync.db.get_last_success(account.run_mode) or ""
+        finally:
+            sync.close()
+
+    def order(self) -> List[Account]:
+        # Least recently synced first (never-synced before everything), so
+        # when a cron window runs out it is the freshest accounts that wait.
+        last = {a.name: self._last_success(a) for a in self.accounts}
+        return sorted(self.accounts, key=lambda a: last[a.name])
+
+    def _sync_account(self, account: Account, full_sync: bool) -> dict:
+        scheduler = RequestScheduler(
+            account.rate_limit_per_minute, account.rate_limit_per_day
+        )
+        sync = WhoopSync(
+            account.tokens_file,
+            account.db_path,
+            account.user_id,
+            scheduler,
+            archive_dir=account.archive_root,
+        )
+        started = time.perf_counter()
+        try:
+            # Never fall back to the interactive browser flow from a worker.
+            if not (sync.auth.load_tokens() and sync.authenticate()):
+                return {"status": "no_tokens", "seconds": 0.0}
+            sync.start_run(account.run_mode)
+            try:
+                sync.sync_all(full_sync=full_sync, parallel=self.parallel)
+            except Exception as e:
+                sync.finish_run("failed", json_path="", textfile_path="")
+                return {
+                    "status": "failed",
+                    "error": f"{type(e).__name__}: {e}",
+                    "seconds": round(time.perf_counter() - started, 3),
+                }
+            report = sync.finish_run("ok", json_path="", textfile_path="")
+            entities = report["entities"].values()
+            return {
+                "status": "ok",
+                "seconds": round(time.perf_counter() - started, 3),
+                "requests": sum(e["requests"] for e in entities),
+                "rows_written": sum(e["rows_written"] for e in entities),
+            }
+        finally:
+            sync.close()
+
+    def _progress(self, out, account: Account, result: dict):
+        with self._lock:
+            self.results[account.name] = result
+            done = len(self.results)
+            failed = sum(1 for r in self.results.values() if r["status"] == "failed")
+            elapsed = time.perf_counter() - self._started
+            detail = (
+                f"{result.get('rows_written', 0)} rows written"
+                if result["status"] == "ok"
+                else result.get("error", result["status"])
+            )
+            print(
+                f"[{done}/{len(self.accounts)}] {account.name}: {result['status']} in "
+                f"{result['seconds']:.1f}s ({detail}); {failed} failed, {elapsed:.0f}s elapsed",
+                file=out,
+                flush=True,
+            )
+
+    def run(self, full_sync: bool = False, report_path: str = None) -> dict:
+        accounts = self.order()
+        out = sys.stdout
+        self._started = time.perf_counter()
+        print(
+            f"Syncing {len(accounts)} accounts on {self.workers} workers...", file=out
+        )
+
+        # Per-account sync output would interleave across workers; only the
+        # progress lines below reach the console.
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = {
+                    pool.submit(self._sync_account, account, full_sync): account
+                    for account in accounts
+                }
+                for future in as_completed(futures):
+                    account = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {"status": "failed", "error": str(e), "seconds": 0.0}
+                    self._progress(out, account, result)
+
+        summary = self.summary()
+        if report_path:
+            _atomic_write(report_path, json.dumps(summary, indent=2))
+        return summary
+
+    def summary(self) -> dict:
+        statuses = {}
+        for result in self.results.values():
+            statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+        return {
+            "accounts": len(self.accounts),
+            "statuses": statuses,
+            "wall_seconds": round(time.perf_counter() - self._started, 3),
+            "requests": sum(r.get("requests", 0) for r in self.results.values()),
+            "rows_written": sum(r.get("rows_written", 0) for r in self.results.values()),
+            "results": self.results,
+        }
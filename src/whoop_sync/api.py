@@ -1,18 +1,68 @@
-from typing import Optional, List, Dict, Any, Generator
+from typing import Optional, List, Dict, Any, Generator, Tuple
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
 
 from .config import config
 from .auth import WhoopAuth
+from .ratelimit import RequestScheduler
+
+ENDPOINTS = {
+    "cycles": "/developer/v2/cycle",
+    "recoveries": "/developer/v2/recovery",
+    "sleeps": "/developer/v2/activity/sleep",
+    "workouts": "/developer/v2/activity/workout",
+}
+
+
+def range_params(start: datetime = None, end: datetime = None) -> dict:
+    params = {}
+    if start:
+        params["start"] = start.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+    if end:
+        params["end"] = end.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+    return params
 
 
 class WhoopAPI:
-    def __init__(self, auth: WhoopAuth):
+    def __init__(
+        self,
+        auth: WhoopAuth,
+        pool_size: int = None,
+        scheduler: RequestScheduler = None,
+    ):
         self.auth = auth
+        self.scheduler = scheduler or RequestScheduler()
+        self.metrics = None
         self.base_url = config.api_base_url
+        self.pool_size = pool_size or config.http_pool_size
+        self.timeout = (config.http_connect_timeout, config.http_read_timeout)
+        self.session = self._create_session()
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size, pool_maxsize=self.pool_size
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(
+            {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+        )
+        return session
+
+    def close(self):
+        self.session.close()
 
     def _headers(self) -> dict:
+        previous = self.auth.access_token
+        started = time.perf_counter()
         token = self.auth.get_valid_access_token()
+        if self.metrics:
+            self.metrics.record_auth(
+                time.perf_counter() - started, refreshed=token != previous
+            )
         if not token:
             raise Exception("No valid access token")
         return {
@@ -20,70 +70,146 @@ class WhoopAPI:
             "Content-Type": "application/json",
         }
 
-    def _get(self, endpoint: str, params: dict = None) -> dict:
+    def _get(self, endpoint: str, params: dict = None, label: str = None) -> dict:
         url = f"{self.base_url}{endpoint}"
-        response = requests.get(url, headers=self._headers(), params=params)
+        attempt = 0
+        refreshed = False
 
-        if response.status_code == 401:
-            if self.auth.refresh_access_token():
-                response = requests.get(url, headers=self._headers(), params=params)
+        while True:
+            self.scheduler.acquire()
+            headers = self._headers()
+            started = time.perf_counter()
+            try:
+                response = self.session.get(
+                    url, headers=headers, params=params, timeout=self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                delay = self.scheduler.error_delay(attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            if self.metrics:
+                self.metrics.record_request(
+                    label,
+                    time.perf_counter() - started,
+                    int(response.headers.get("Content-Length") or len(response.content)),
+                )
+
+            if response.status_code == 401 and not refreshed:
+                refreshed = True
+                # Another thread may already have refreshed past this token.
+                stale = headers["Authorization"].removeprefix("Bearer ")
+                if self.auth.refresh_access_token(stale_token=stale):
+                    continue
+
+            delay = self.scheduler.retry_delay(
+                response.status_code, response.headers, attempt
+            )
+            if delay is None:
+                break
+            print(f"  {response.status_code} from {endpoint}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
 
         response.raise_for_status()
         return response.json()
 
-    def _paginate(
-        self, endpoint: str, params: dict = None, key: str = "records"
-    ) -> Generator[List[Dict], None, None]:
+    def _paginate_pages(
+        self,
+        endpoint: str,
+        params: dict = None,
+        key: str = "records",
+        next_token: str = None,
+        label: str = None,
+    ) -> Generator[Tuple[List[Dict], Optional[str]], None, None]:
         if params is None:
             params = {}
 
         params["limit"] = params.get("limit", 25)
+        if next_token:
+            params["nextToken"] = next_token
 
         while True:
-            data = self._get(endpoint, params)
-            records = data.get(key, [])
+            data = self._get(endpoint, params, label)
+            next_token = data.get("next_token")
 
-            if records:
-                yield records
+            yield data.get(key, []), next_token
 
-            next_token = data.get("next_token")
             if not next_token:
                 break
 
             params["nextToken"] = next_token
 
+    def _paginate(
+        self, endpoint: str, params: dict = None, key: str = "records"
+    ) -> Generator[List[Dict], None, None]:
+        for records, _ in self._paginate_pages(endpoint, params, key):
+            if records:
+                yield records
+
+    def fetch_pages(
+        self,
+        label: str,
+        start: datetime = None,
+        end: datetime = None,
+        next_token: str = None,
+    ) -> Generator[Tuple[List[Dict], Optional[str]], None, None]:
+        yield from self._paginate_pages(
+            ENDPOINTS[label], range_params(start, end), next_token=next_token, label=label
+        )
+
+    def has_records(
+        self, label: str, start: datetime = None, end: datetime = None
+    ) -> bool:
+        params = range_params(start, end)
+        params["limit"] = 1
+        return bool(self._get(ENDPOINTS[label], params, label).get("records"))
+
     def get_profile(self) -> dict:
-        return self._get("/developer/v2/user/profile/basic")
+        return self._get("/developer/v2/user/profile/basic", label="profile")
 
     def get_body_measurement(self) -> dict:
-        return self._get("/developer/v2/user/measurement/body")
+        return self._get("/developer/v2/user/measurement/body", label="profile")
+
+    def get_cycle(self, cycle_id: int) -> dict:
+        return self._get(f"{ENDPOINTS['cycles']}/{cycle_id}", label="cycles")
+
+    def get_cycle_recovery(self, cycle_id: int) -> dict:
+        return self._get(f"{ENDPOINTS['cycles']}/{cycle_id}/recovery", label="recoveries")
+
+    def get_cycle_sleep(self, cycle_id: int) -> dict:
+        return self._get(f"{ENDPOINTS['cycles']}/{cycle_id}/sleep", label="sleeps")
+
+    def get_sleep(self, sleep_id: str) -> dict:
+        return self._get(f"{ENDPOINTS['sleeps']}/{sleep_id}", label="sleeps")
+
+    def get_workout(self, workout_id: str) -> dict:
+        return self._get(f"{ENDPOINTS['workouts']}/{workout_id}", label="workouts")
 
     def _fetch_range(
         self, endpoint: str, start: datetime = None, end: datetime = None
     ) -> Generator[List[Dict], None, None]:
-        params = {}
-        if start:
-            params["start"] = start.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
-        if end:
-            params["end"] = end.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
-        yield from self._paginate(endpoint, params)
+        yield from self._paginate(endpoint, range_params(start, end))
 
     def get_cycles(
         self, start: datetime = None, end: datetime = None
     ) -> Generator[List[Dict], None, None]:
-        yield from self._fetch_range("/developer/v2/cycle", start, end)
+        yield from self._fetch_range(ENDPOINTS["cycles"], start, end)
 
     def get_recoveries(
         self, start: datetime = None, end: datetime = None
     ) -> Generator[List[Dict], None, None]:
-        yield from self._fetch_range("/developer/v2/recovery", start, end)
+        yield from self._fetch_range(ENDPOINTS["recoveries"], start, end)
 
     def get_sleeps(
         self, start: datetime = None, end: datetime = None
     ) -> Generator[List[Dict], None, None]:
-        yield from self._fetch_range("/developer/v2/activity/sleep", start, end)
+        yield from self._fetch_range(ENDPOINTS["sleeps"], start, end)
 
     def get_workouts(
         self, start: datetime = None, end: datetime = None
     ) -> Generator[List[Dict], None, None]:
-        yield from self._fetch_range("/developer/v2/activity/workout", start, end)
+        yield from self._fetch_range(ENDPOINTS["workouts"], start, end)
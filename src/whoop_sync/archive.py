@@ -0,0 +1,94 @@
+import gzip
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Dict, Generator
+
+from .config import config
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _segment_month(label: str, record: dict) -> str:
+    # Recoveries have no start; they are created shortly after their cycle's.
+    value = record.get("created_at") if label == "recoveries" else record.get("start")
+    return (value or "unknown")[:7]
+
+
+class RawArchive:
+    """Append-only NDJSON archive of raw API pages, one file per entity and month."""
+
+    def __init__(self, root: str = None, compression: str = None):
+        self.root = root or config.archive_dir
+        self.compression = compression or ("zst" if zstandard else "gz")
+        if self.compression == "zst" and zstandard is None:
+            raise RuntimeError("zstd archives need the 'zstandard' package")
+        self._lock = threading.Lock()
+
+    def _write(self, path: str, data: bytes):
+        if self.compression == "zst":
+            # Each append is its own zstd frame; readers decode across frames.
+            with open(path, "ab") as f:
+                f.write(zstandard.ZstdCompressor().compress(data))
+        else:
+            with gzip.open(path, "ab") as f:
+                f.write(data)
+
+    def append(self, label: str, records: List[Dict]):
+        if not records:
+            return
+        by_month = defaultdict(list)
+        for record in records:
+            by_month[_segment_month(label, record)].append(record)
+
+        fetched_at = datetime.utcnow().isoformat()
+        with self._lock:
+            directory = os.path.join(self.root, label)
+            os.makedirs(directory, exist_ok=True)
+            for month, month_records in by_month.items():
+                line = json.dumps({"fetched_at": fetched_at, "records": month_records})
+                path = os.path.join(directory, f"{month}.ndjson.{self.compression}")
+                self._write(path, line.encode() + b"\n")
+
+    def segments(self, label: str) -> List[str]:
+        directory = os.path.join(self.root, label)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            os.path.join(directory, name)
+            for name in os.listdir(directory)
+            if name.endswith((".ndjson.gz", ".ndjson.zst"))
+        )
+
+    def _lines(self, path: str) -> Generator[bytes, None, None]:
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError(f"{path} needs the 'zstandard' package to read")
+            with open(path, "rb") as f:
+                reader = zstandard.ZstdDecompressor().stream_reader(
+                    f, read_across_frames=True
+                )
+                buffer = b""
+                while True:
+                    chunk = reader.read(1 << 20)
+                    if not chunk:
+                        break
+                    buffer += chunk
+                    *lines, buffer = buffer.split(b"\n")
+                    yield from lines
+                if buffer:
+                    yield buffer
+        else:
+            with gzip.open(path, "rb") as f:
+                yield from f
+
+    def read(self, label: str) -> Generator[List[Dict], None, None]:
+        for path in self.segments(label):
+            for line in self._lines(path):
+                if line.strip():
+                    yield json.loads(line)["records"]
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import time
+from typing import Optional, List, Dict, AsyncGenerator, Tuple
+from datetime import datetime
+
+import aiohttp
+
+from .config import config
+from .api import ENDPOINTS, range_params
+from .auth import WhoopAuth
+from .ratelimit import RequestScheduler
+
+
+class AsyncWhoopAPI:
+    def __init__(
+        self,
+        auth: WhoopAuth,
+        pool_size: int = None,
+        scheduler: RequestScheduler = None,
+    ):
+        self.auth = auth
+        self.scheduler = scheduler or RequestScheduler()
+        self.metrics = None
+        self.base_url = config.api_base_url
+        self.pool_size = pool_size or config.http_pool_size
+        self.session = None
+
+    async def __aenter__(self) -> "AsyncWhoopAPI":
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size),
+            timeout=aiohttp.ClientTimeout(
+                sock_connect=config.http_connect_timeout,
+                sock_read=config.http_read_timeout,
+            ),
+            headers={"Accept-Encoding": "gzip, deflate"},
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def _headers(self) -> dict:
+        # Token refresh is a blocking requests call; keep it off the event loop.
+        previous = self.auth.access_token
+        started = time.perf_counter()
+        token = await asyncio.to_thread(self.auth.get_valid_access_token)
+        if self.metrics:
+            self.metrics.record_auth(
+                time.perf_counter() - started, refreshed=token != previous
+            )
+        if not token:
+            raise Exception("No valid access token")
+        return {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+        }
+
+    async def _get(self, endpoint: str, params: dict = None, label: str = None) -> dict:
+        url = f"{self.base_url}{endpoint}"
+        attempt = 0
+        refreshed = False
+
+        while True:
+            await asyncio.sleep(self.scheduler.wait_time())
+            headers = await self._headers()
+            started = time.perf_counter()
+            try:
+                async with self.session.get(
+                    url, headers=headers, params=params
+                ) as response:
+                    body = await response.read()
+                    if self.metrics:
+                        self.metrics.record_request(
+                            label, time.perf_counter() - started, len(body)
+                        )
+
+                    if response.status == 401 and not refreshed:
+                        refreshed = True
+                        stale = headers["Authorization"].removeprefix("Bearer ")
+                        if await asyncio.to_thread(
+                            self.auth.refresh_access_token, stale_token=stale
+                        ):
+                            continue
+
+                    delay = self.scheduler.retry_delay(
+                        response.status, response.headers, attempt
+                    )
+                    if delay is None:
+                        response.raise_for_status()
+                        return json.loads(body)
+                    print(f"  {response.status} from {endpoint}, retrying in {delay:.1f}s")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                delay = self.scheduler.error_delay(attempt)
+                if delay is None:
+                    raise
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _paginate_pages(
+        self,
+        endpoint: str,
+        params: dict = None,
+        key: str = "records",
+        next_token: str = None,
+        label: str = None,
+    ) -> AsyncGenerator[Tuple[List[Dict], Optional[str]], None]:
+        if params is None:
+            params = {}
+
+        params["limit"] = params.get("limit", 25)
+        if next_token:
+            params["nextToken"] = next_token
+
+        while True:
+            data = await self._get(endpoint, params, label)
+            next_token = data.get("next_token")
+
+            yield data.get(key, []), next_token
+
+            if not next_token:
+                break
+
+            params["nextToken"] = next_token
+
+    async def _paginate(
+        self, endpoint: str, params: dict = None, key: str = "records"
+    ) -> AsyncGenerator[List[Dict], None]:
+        async for records, _ in self._paginate_pages(endpoint, params, key):
+            if records:
+                yield records
+
+    async def fetch_pages(
+        self,
+        label: str,
+        start: datetime = None,
+        end: datetime = None,
+        next_token: str = None,
+    ) -> AsyncGenerator[Tuple[List[Dict], Optional[str]], None]:
+        async for page in self._paginate_pages(
+            ENDPOINTS[label], range_params(start, end), next_token=next_token, label=label
+        ):
+            yield page
+
+    async def get_profile(self) -> dict:
+        return await self._get("/developer/v2/user/profile/basic", label="profile")
+
+    async def get_body_measurement(self) -> dict:
+        return await self._get("/developer/v2/user/measurement/body", label="profile")
+
+    async def _fetch_range(
+        self, endpoint: str, start: datetime = None, end: datetime = None
+    ) -> AsyncGenerator[List[Dict], None]:
+        async for records in self._paginate(endpoint, range_params(start, end)):
+            yield records
+
+    async def get_cycles(
+        self, start: datetime = None, end: datetime = None
+    ) -> AsyncGenerator[List[Dict], None]:
+        async for records in self._fetch_range(ENDPOINTS["cycles"], start, end):
+            yield records
+
+    async def get_recoveries(
+        self, start: datetime = None, end: datetime = None
+    ) -> AsyncGenerator[List[Dict], None]:
+        async for records in self._fetch_range(ENDPOINTS["recoveries"], start, end):
+            yield records
+
+    async def get_sleeps(
+        self, start: datetime = None, end: datetime = None
+    ) -> AsyncGenerator[List[Dict], None]:
+        async for records in self._fetch_range(ENDPOINTS["sleeps"], start, end):
+            yield records
+
+    async def get_workouts(
+        self, start: datetime = None, end: datetime = None
+    ) -> AsyncGenerator[List[Dict], None]:
+        async for records in self._fetch_range(ENDPOINTS["workouts"], start, end):
+            yield records
@@ -1,14 +1,32 @@
+import contextlib
 import json
 import secrets
 import urllib.parse
 import os
 from http.server import HTTPServer, BaseHTTPRequestHandler
-from threading import Thread
+from threading import Lock, Thread
 import time
 import requests
 
+try:
+    import fcntl
+except ImportError:  # Windows: only threads in this process are serialized
+    fcntl = None
+
 from .config import config
 
+_TIMEOUT = (config.http_connect_timeout, config.http_read_timeout)
+
+# One lock per tokens file, shared by every WhoopAuth in this process
+# (parallel entity syncs, account workers, the daemon's webhook thread).
+_file_locks = {}
+_file_locks_guard = Lock()
+
+
+def _thread_lock(path: str) -> Lock:
+    with _file_locks_guard:
+        return _file_locks.setdefault(os.path.abspath(path), Lock())
+
 
 class CallbackHandler(BaseHTTPRequestHandler):
     auth_code = None
@@ -46,12 +64,38 @@ class CallbackHandler(BaseHTTPRequestHandler):
 
 
 class WhoopAuth:
-    def __init__(self):
+    def __init__(self, tokens_file: str = None):
+        self.tokens_file = tokens_file or config.tokens_file
         self.access_token = None
         self.refresh_token = None
         self.expires_at = None
         self._server = None
 
+    @contextlib.contextmanager
+    def _token_lock(self, shared: bool = False):
+        """Serialize token file access across threads and processes.
+
+        Cron, a manual sync and the status command can all run at once;
+        holding this while refreshing means only one of them rotates the
+        refresh token and the rest pick up the result.
+        """
+        thread_lock = None if shared else _thread_lock(self.tokens_file)
+        if thread_lock:
+            thread_lock.acquire()
+        try:
+            if fcntl is None:
+                yield
+                return
+            with open(f"{self.tokens_file}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            if thread_lock:
+                thread_lock.release()
+
     def get_authorization_url(self, state: str = None) -> str:
         if state is None:
             state = secrets.token_urlsafe(16)
@@ -121,7 +165,11 @@ class WhoopAuth:
             "client_secret": config.client_secret,
         }
 
-        response = requests.post(config.token_url, data=data)
+        try:
+            response = requests.post(config.token_url, data=data, timeout=_TIMEOUT)
+        except requests.RequestException as e:
+            print(f"Token exchange failed: {e}")
+            return False
 
         if response.status_code == 200:
             token_data = response.json()
@@ -135,7 +183,27 @@ class WhoopAuth:
             print(f"Token exchange failed: {response.text}")
             return False
 
-    def refresh_access_token(self, max_retries: int = 3) -> bool:
+    def refresh_access_token(self, max_retries: int = 3, stale_token: str = None) -> bool:
+        """Refresh the access token, at most once across concurrent callers.
+
+        Pass the access token that was found expired or rejected as
+        ``stale_token``: if someone else (another thread or process) replaced
+        it while we waited for the lock, their token is adopted instead of
+        refreshing again. Without it the refresh is forced.
+        """
+        with self._token_lock():
+            # Always refresh with the newest refresh token on disk; ours may
+            # have been rotated out by another process already.
+            self._read_tokens()
+            if (
+                stale_token is not None
+                and self.access_token != stale_token
+                and not self.is_token_expired()
+            ):
+                return True
+            return self._refresh(max_retries)
+
+    def _refresh(self, max_retries: int) -> bool:
         if not self.refresh_token:
             return False
 
@@ -148,14 +216,26 @@ class WhoopAuth:
                 "client_secret": config.client_secret,
             }
 
-            response = requests.post(config.token_url, data=data)
+            # This runs under the cross-process token lock; a hung token
+            # endpoint must not stall every other sync waiting on it.
+            try:
+                response = requests.post(config.token_url, data=data, timeout=_TIMEOUT)
+            except requests.RequestException as e:
+                if attempt < max_retries - 1:
+                    print(
+                        f"Token refresh failed (attempt {attempt + 1}/{max_retries}): {e}, retrying..."
+                    )
+                    time.sleep(2**attempt)
+                    continue
+                print(f"Token refresh failed: {e}")
+                return False
 
             if response.status_code == 200:
                 token_data = response.json()
                 self.access_token = token_data["access_token"]
                 self.refresh_token = token_data["refresh_token"]
                 self.expires_at = time.time() + token_data.get("expires_in", 3600)
-                self.save_tokens()
+                self._write_tokens()
                 return True
             elif response.status_code == 401 and attempt < max_retries - 1:
                 print(
@@ -175,29 +255,44 @@ class WhoopAuth:
 
     def get_valid_access_token(self) -> str | None:
         if self.is_token_expired():
-            if not self.refresh_access_token():
+            if not self.refresh_access_token(stale_token=self.access_token):
                 return None
         return self.access_token
 
     def save_tokens(self):
+        with self._token_lock():
+            self._write_tokens()
+
+    def _write_tokens(self):
         token_data = {
             "access_token": self.access_token,
             "refresh_token": self.refresh_token,
             "expires_at": self.expires_at,
         }
-        with open(config.tokens_file, "w") as f:
+        # Write beside the real file and rename over it, so a reader never
+        # sees a truncated tokens file.
+        tmp = f"{self.tokens_file}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
             json.dump(token_data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.tokens_file)
 
     def load_tokens(self) -> bool:
+        with self._token_lock(shared=True):
+            return self._read_tokens()
+
+    def _read_tokens(self) -> bool:
         try:
-            with open(config.tokens_file, "r") as f:
+            with open(self.tokens_file, "r") as f:
                 token_data = json.load(f)
-            self.access_token = token_data.get("access_token")
-            self.refresh_token = token_data.get("refresh_token")
-            self.expires_at = token_data.get("expires_at")
-            return bool(self.access_token and self.refresh_token)
         except (FileNotFoundError, json.JSONDecodeError):
             return False
+        self.access_token = token_data.get("access_token")
+        self.refresh_token = token_data.get("refresh_token")
+        self.expires_at = token_data.get("expires_at")
+        return bool(self.access_token and self.refresh_token)
 
     def is_authenticated(self) -> bool:
         return bool(self.access_token and self.refresh_token)
@@ -210,5 +305,6 @@ class WhoopAuth:
         self.access_token = None
         self.refresh_token = None
         self.expires_at = None
-        if os.path.exists(config.tokens_file):
-            os.remove(config.tokens_file)
+        with self._token_lock():
+            if os.path.exists(self.tokens_file):
+                os.remove(self.tokens_file)
@@ -14,15 +14,56 @@ class Config:
         "WHOOP_REDIRECT_URI", "http://localhost:8080/callback"
     )
     db_path: str = os.getenv("WHOOP_DB_PATH", "whoop.db")
+    db_cache_kb: int = int(os.getenv("WHOOP_DB_CACHE_KB", "65536"))
+    db_mmap_mb: int = int(os.getenv("WHOOP_DB_MMAP_MB", "256"))
+    db_busy_timeout: float = float(os.getenv("WHOOP_DB_BUSY_TIMEOUT", "30"))
     tokens_file: str = os.getenv("WHOOP_TOKENS_FILE", "tokens.json")
+    accounts_file: str = os.getenv("WHOOP_ACCOUNTS_FILE", "accounts.json")
+    account_workers: int = int(os.getenv("WHOOP_ACCOUNT_WORKERS", "8"))
+    archive_dir: str = os.getenv("WHOOP_ARCHIVE_DIR", "archive")
+    metrics_json: str = os.getenv("WHOOP_METRICS_JSON", "")
+    metrics_textfile: str = os.getenv("WHOOP_METRICS_TEXTFILE", "")
+    http_pool_size: int = int(os.getenv("WHOOP_HTTP_POOL_SIZE", "8"))
+    http_connect_timeout: float = float(os.getenv("WHOOP_HTTP_CONNECT_TIMEOUT", "5"))
+    http_read_timeout: float = float(os.getenv("WHOOP_HTTP_READ_TIMEOUT", "30"))
+    rate_limit_per_minute: int = int(os.getenv("WHOOP_RATE_LIMIT_PER_MINUTE", "100"))
+    rate_limit_per_day: int = int(os.getenv("WHOOP_RATE_LIMIT_PER_DAY", "10000"))
+    max_retries: int = int(os.getenv("WHOOP_MAX_RETRIES", "5"))
+    backoff_base: float = 1.0
+    backoff_cap: float = 60.0
+    circuit_failure_threshold: int = int(os.getenv("WHOOP_CIRCUIT_THRESHOLD", "8"))
+    circuit_cooldown: float = float(os.getenv("WHOOP_CIRCUIT_COOLDOWN", "120"))
+    repair_days: int = int(os.getenv("WHOOP_REPAIR_DAYS", "14"))
+    prefetch_depth: int = int(os.getenv("WHOOP_PREFETCH_DEPTH", "2"))
+    write_queue_size: int = int(os.getenv("WHOOP_WRITE_QUEUE_SIZE", "16"))
+    daemon_interval: float = float(os.getenv("WHOOP_DAEMON_INTERVAL", "900"))
+    daemon_max_interval: float = float(os.getenv("WHOOP_DAEMON_MAX_INTERVAL", "3600"))
+    daemon_host: str = os.getenv("WHOOP_DAEMON_HOST", "127.0.0.1")
+    daemon_port: int = int(os.getenv("WHOOP_DAEMON_PORT", "8081"))
+    daemon_unhealthy_after: int = 3
+    webhook_host: str = os.getenv("WHOOP_WEBHOOK_HOST", "127.0.0.1")
+    webhook_port: int = int(os.getenv("WHOOP_WEBHOOK_PORT", "0"))
+    webhook_secret: str = os.getenv("WHOOP_WEBHOOK_SECRET", "")
+    webhook_debounce: float = float(os.getenv("WHOOP_WEBHOOK_DEBOUNCE", "5"))
+    backfill_start: str = os.getenv("WHOOP_BACKFILL_START", "2015-01-01")
+    shard_days: float = float(os.getenv("WHOOP_SHARD_DAYS", "90"))
+    shard_pages: int = int(os.getenv("WHOOP_SHARD_PAGES", "8"))
+    shard_min_days: float = 7
+    shard_max_days: float = 365
 
-    auth_url: str = "https://api.prod.whoop.com/oauth/oauth2/auth"
-    token_url: str = "https://api.prod.whoop.com/oauth/oauth2/token"
-    api_base_url: str = "https://api.prod.whoop.com"
+    # Point WHOOP_API_BASE_URL at src/whoop_sync/fake_server.py to sync offline;
+    # the OAuth URLs follow it unless set explicitly.
+    api_base_url: str = os.getenv("WHOOP_API_BASE_URL", "https://api.prod.whoop.com")
+    auth_url: str = os.getenv("WHOOP_AUTH_URL", "")
+    token_url: str = os.getenv("WHOOP_TOKEN_URL", "")
 
     scopes: List[str] = field(default_factory=list)
 
     def __post_init__(self):
+        if not self.auth_url:
+            self.auth_url = f"{self.api_base_url}/oauth/oauth2/auth"
+        if not self.token_url:
+            self.token_url = f"{self.api_base_url}/oauth/oauth2/token"
         if not self.scopes:
             self.scopes = [
                 "offline",
@@ -0,0 +1,205 @@
+import json
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .config import config
+from .sync import WhoopSync, ENTITY_TYPES
+from .webhooks import EventQueue
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    daemon = None
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            healthy = self.daemon.is_healthy()
+            self._send(
+                200 if healthy else 503,
+                {"status": "ok" if healthy else "unhealthy", "state": self.daemon.state},
+            )
+        elif self.path == "/stats":
+            self._send(200, self.daemon.status())
+        else:
+            self._send(404, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SyncDaemon:
+    """Keeps one WhoopSync (SQLite connection, HTTP pool, tokens) warm and
+    polls incrementally, backing off after failures."""
+
+    def __init__(
+        self,
+        sync: WhoopSync = None,
+        interval: float = None,
+        max_interval: float = None,
+        parallel: int = 1,
+        events: EventQueue = None,
+    ):
+        self.sync = sync or WhoopSync()
+        self.interval = interval or config.daemon_interval
+        self.max_interval = max(max_interval or config.daemon_max_interval, self.interval)
+        self.parallel = parallel
+        self.events = events
+        self.events_applied = 0
+        self.state = "starting"
+        self.started_at = datetime.utcnow()
+        self.polls = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_run = None
+        self.last_success_at = None
+        self.next_poll_at = None
+        self._profile_synced_at = None
+        self._stop = threading.Event()
+        self._server = None
+
+    def is_healthy(self) -> bool:
+        if self.failures >= config.daemon_unhealthy_after:
+            return False
+        if self.last_success_at is None:
+            return True
+        # Stale data is unhealthy even if nothing is failing loudly.
+        stale_after = timedelta(seconds=3 * self.max_interval)
+        return datetime.utcnow() - self.last_success_at < stale_after
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "started_at": self.started_at.isoformat(),
+            "polls": self.polls,
+            "consecutive_failures": self.failures,
+            "last_error": self.last_error,
+            "last_success_at": self.last_success_at and self.last_success_at.isoformat(),
+            "next_poll_at": self.next_poll_at and self.next_poll_at.isoformat(),
+            "interval": self.interval,
+            "last_run": self.last_run,
+            "webhooks": self.events
+            and {
+                "received": self.events.received,
+                "coalesced": self.events.coalesced,
+                "pending": self.events.pending(),
+                "applied": self.events_applied,
+            },
+        }
+
+    def start_status_server(self, host: str = None, port: int = None):
+        handler = type("BoundStatusHandler", (StatusHandler,), {"daemon": self})
+        self._server = ThreadingHTTPServer(
+            (host or config.daemon_host, config.daemon_port if port is None else port),
+            handler,
+        )
+        self._server.daemon_threads = True
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self._server
+
+    def _authenticated(self) -> bool:
+        if self.sync.api:
+            return True
+        # Never start the interactive browser flow from the daemon; wait for
+        # 'main.py auth' to write a tokens file instead.
+        if self.sync.auth.load_tokens() and self.sync.auth.is_authenticated():
+            return self.sync.authenticate()
+        return False
+
+    def poll(self):
+        self.sync.start_run("daemon")
+        try:
+            due = self._profile_synced_at is None or (
+                datetime.utcnow() - self._profile_synced_at > timedelta(days=1)
+            )
+            if due:
+                self.sync.sync_profile()
+                self.sync.sync_body_measurement()
+                self._profile_synced_at = datetime.utcnow()
+            self.sync.sync_types(ENTITY_TYPES, parallel=self.parallel)
+            self.sync.repair()
+        except Exception:
+            self.last_run = self.sync.finish_run("failed")
+            raise
+        self.last_run = self.sync.finish_run("ok")
+
+    def apply_events(self, batch):
+        self.sync.start_run("webhook")
+        try:
+            self.sync.apply_events(batch)
+        except Exception as e:
+            self.sync.finish_run("failed")
+            # The next poll picks these records up anyway.
+            print(f"Applying {len(batch)} webhook events failed: {type(e).__name__}: {e}")
+            return
+        self.sync.finish_run("ok")
+        self.events_applied += len(batch)
+
+    def _idle(self, delay: float):
+        # Sleep until the next poll, applying webhook events as they come due.
+        # They run on this thread, which owns the SQLite connection.
+        deadline = time.monotonic() + delay
+        while not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if not self.events or not self.sync.api:
+                # Until we're authenticated, events stay queued for later.
+                self._stop.wait(remaining)
+                continue
+            batch = self.events.take_due(min(remaining, 1.0))
+            if batch:
+                self.apply_events(batch)
+
+    def _next_delay(self) -> float:
+        if not self.failures:
+            return self.interval
+        return min(self.interval * 2 ** self.failures, self.max_interval)
+
+    def stop(self, *_):
+        self.state = "stopping"
+        self._stop.set()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        print(f"Sync daemon polling every {self.interval:.0f}s")
+
+        while not self._stop.is_set():
+            if not self._authenticated():
+                self.state = "waiting_for_auth"
+                print("No valid tokens yet. Run: python main.py auth")
+                delay = self.interval
+            else:
+                self.state = "syncing"
+                self.polls += 1
+                try:
+                    self.poll()
+                    self.failures = 0
+                    self.last_error = None
+                    self.last_success_at = datetime.utcnow()
+                except Exception as e:
+                    self.failures += 1
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    print(f"Poll failed ({self.failures} in a row): {self.last_error}")
+                delay = self._next_delay()
+                self.state = "idle" if not self.failures else "backing_off"
+
+            self.next_poll_at = datetime.utcnow() + timedelta(seconds=delay)
+            self._idle(delay)
+
+        self.state = "stopped"
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
@@ -1,173 +1,783 @@
+import json
+import re
 import sqlite3
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+from pathlib import Path
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
 
 from .config import config
-from .models import SCHEMA
+from .models import DERIVED_SCHEMA, SCHEMA, TIME_COLUMNS, TIME_INDEXES, TIME_TABLES
+
+
+CYCLE_COLUMNS = (
+    "id", "user_id", "created_at", "updated_at", "start", "end",
+    "timezone_offset", "score_state", "strain", "kilojoule",
+    "average_heart_rate", "max_heart_rate", "start_ms", "end_ms", "day",
+)
+
+RECOVERY_COLUMNS = (
+    "cycle_id", "sleep_id", "user_id", "created_at", "updated_at",
+    "score_state", "user_calibrating", "recovery_score", "resting_heart_rate",
+    "hrv_rmssd_milli", "spo2_percentage", "skin_temp_celsius",
+)
+
+SLEEP_COLUMNS = (
+    "id", "cycle_id", "user_id", "created_at", "updated_at", "start", "end",
+    "timezone_offset", "nap", "score_state", "total_in_bed_time_milli",
+    "total_awake_time_milli", "total_light_sleep_time_milli",
+    "total_slow_wave_sleep_time_milli", "total_rem_sleep_time_milli",
+    "sleep_cycle_count", "disturbance_count", "respiratory_rate",
+    "sleep_performance_percentage", "sleep_consistency_percentage",
+    "sleep_efficiency_percentage", "start_ms", "end_ms", "day",
+)
+
+WORKOUT_COLUMNS = (
+    "id", "user_id", "created_at", "updated_at", "start", "end",
+    "timezone_offset", "sport_name", "sport_id", "score_state", "strain",
+    "average_heart_rate", "max_heart_rate", "kilojoule", "percent_recorded",
+    "distance_meter", "altitude_gain_meter", "altitude_change_meter",
+    "zone_zero_milli", "zone_one_milli", "zone_two_milli", "zone_three_milli",
+    "zone_four_milli", "zone_five_milli", "start_ms", "end_ms", "day",
+)
+
+
+_OFFSET = re.compile(r"([+-])(\d{2}):?(\d{2})")
+
+
+def _parse_time(timestamp: str) -> datetime:
+    return datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+
+
+def _epoch_ms(timestamp: Optional[str]) -> Optional[int]:
+    if not timestamp:
+        return None
+    return int(_parse_time(timestamp).timestamp() * 1000)
+
+
+def _local_day(timestamp: Optional[str], offset: Optional[str]) -> Optional[str]:
+    """Calendar date of a UTC timestamp where it happened ("-05:00" offset)."""
+    if not timestamp:
+        return None
+    moment = _parse_time(timestamp)
+    match = _OFFSET.fullmatch(offset or "")
+    if match:
+        sign, hours, minutes = match.groups()
+        shift = timedelta(hours=int(hours), minutes=int(minutes))
+        moment = moment + shift if sign == "+" else moment - shift
+    return moment.date().isoformat()
+
+
+def _time_fields(record: dict) -> tuple:
+    return (
+        _epoch_ms(record["start"]),
+        _epoch_ms(record.get("end")),
+        _local_day(record["start"], record.get("timezone_offset")),
+    )
+
+
+def _upsert_sql(
+    table: str, key: str, columns: Tuple[str, ...], force: bool = False
+) -> str:
+    # Only touch an existing row when the API reports a newer version of it;
+    # re-fetched but unchanged records cost a lookup, not a delete + insert.
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != key)
+    sql = f"""
+    INSERT INTO {table} ({", ".join(columns)})
+    VALUES ({", ".join("?" * len(columns))})
+    ON CONFLICT({key}) DO UPDATE SET {updates}
+"""
+    if not force:
+        sql += f"""    WHERE {table}.updated_at IS NULL OR excluded.updated_at > {table}.updated_at
+"""
+    return sql
+
+
+# entity -> (skip-unchanged upsert, unconditional upsert)
+UPSERTS = {
+    "cycles": (
+        _upsert_sql("cycles", "id", CYCLE_COLUMNS),
+        _upsert_sql("cycles", "id", CYCLE_COLUMNS, force=True),
+    ),
+    "recoveries": (
+        _upsert_sql("recoveries", "cycle_id", RECOVERY_COLUMNS),
+        _upsert_sql("recoveries", "cycle_id", RECOVERY_COLUMNS, force=True),
+    ),
+    "sleeps": (
+        _upsert_sql("sleeps", "id", SLEEP_COLUMNS),
+        _upsert_sql("sleeps", "id", SLEEP_COLUMNS, force=True),
+    ),
+    "workouts": (
+        _upsert_sql("workouts", "id", WORKOUT_COLUMNS),
+        _upsert_sql("workouts", "id", WORKOUT_COLUMNS, force=True),
+    ),
+}
+
+
+# Recompute daily_facts rows from the source tables. {where} selects cycles.
+_FACTS_SQL = """
+    INSERT OR REPLACE INTO daily_facts
+    SELECT
+        c.id, c.user_id, c.day, c.strain, c.kilojoule,
+        c.average_heart_rate, c.max_heart_rate,
+        r.score_state, r.recovery_score, r.resting_heart_rate,
+        r.hrv_rmssd_milli, r.spo2_percentage, r.skin_temp_celsius,
+        s.id,
+        s.total_light_sleep_time_milli / 3600000.0,
+        s.total_slow_wave_sleep_time_milli / 3600000.0,
+        s.total_rem_sleep_time_milli / 3600000.0,
+        (s.total_light_sleep_time_milli + s.total_slow_wave_sleep_time_milli
+            + s.total_rem_sleep_time_milli) / 3600000.0,
+        s.total_awake_time_milli / 60000.0,
+        s.sleep_performance_percentage, s.sleep_efficiency_percentage,
+        s.sleep_consistency_percentage, s.respiratory_rate, s.disturbance_count,
+        COALESCE(w.workout_count, 0), COALESCE(w.workout_strain, 0),
+        COALESCE(w.workout_kilojoule, 0),
+        w.zone_zero_milli, w.zone_one_milli, w.zone_two_milli,
+        w.zone_three_milli, w.zone_four_milli, w.zone_five_milli
+    FROM cycles c
+    LEFT JOIN recoveries r ON r.cycle_id = c.id
+    LEFT JOIN sleeps s ON s.id = (
+        SELECT id FROM sleeps
+        WHERE cycle_id = c.id AND nap = 0
+        ORDER BY start_ms DESC LIMIT 1
+    )
+    LEFT JOIN (
+        SELECT
+            user_id, day,
+            COUNT(*) AS workout_count,
+            SUM(strain) AS workout_strain,
+            SUM(kilojoule) AS workout_kilojoule,
+            SUM(zone_zero_milli) AS zone_zero_milli,
+            SUM(zone_one_milli) AS zone_one_milli,
+            SUM(zone_two_milli) AS zone_two_milli,
+            SUM(zone_three_milli) AS zone_three_milli,
+            SUM(zone_four_milli) AS zone_four_milli,
+            SUM(zone_five_milli) AS zone_five_milli
+        FROM workouts
+        WHERE user_id IN (SELECT user_id FROM cycles c WHERE {where})
+            AND day IN (SELECT day FROM cycles c WHERE {where})
+        GROUP BY user_id, day
+    ) w ON w.day = c.day AND w.user_id IS c.user_id
+    WHERE {where}
+"""
+
+
+# daily_facts columns summarized into rollups.
+ROLLUP_METRICS = (
+    "strain", "kilojoule", "average_heart_rate", "max_heart_rate",
+    "recovery_score", "resting_heart_rate", "hrv_rmssd_milli",
+    "spo2_percentage", "skin_temp_celsius", "light_sleep_hrs",
+    "deep_sleep_hrs", "rem_sleep_hrs", "total_sleep_hrs", "awake_min",
+    "sleep_performance_percentage", "sleep_efficiency_percentage",
+    "respiratory_rate", "workout_count", "workout_strain",
+)
+
+
+def period_start(resolution: str, day: str) -> str:
+    """First day of the week (Monday) or month containing ``day``."""
+    d = date.fromisoformat(day)
+    if resolution == "week":
+        return (d - timedelta(days=d.weekday())).isoformat()
+    return d.replace(day=1).isoformat()
+
+
+def _period_end(resolution: str, start: str) -> str:
+    d = date.fromisoformat(start)
+    if resolution == "week":
+        return (d + timedelta(days=7)).isoformat()
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1).isoformat()
+
+
+def _percentile(values: List[float], q: float) -> float:
+    # Linear interpolation between closest ranks (numpy's default).
+    position = (len(values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def _summaries(values: List[float]) -> tuple:
+    values = sorted(values)
+    return (
+        sum(values) / len(values),
+        values[0],
+        values[-1],
+        _percentile(values, 0.1),
+        _percentile(values, 0.9),
+        len(values),
+    )
+
+
+def _cycle_row(cycle: dict) -> tuple:
+    score = cycle.get("score") or {}
+    return (
+        cycle["id"],
+        cycle["user_id"],
+        cycle["created_at"],
+        cycle["updated_at"],
+        cycle["start"],
+        cycle.get("end"),
+        cycle.get("timezone_offset"),
+        cycle["score_state"],
+        score.get("strain"),
+        score.get("kilojoule"),
+        score.get("average_heart_rate"),
+        score.get("max_heart_rate"),
+        *_time_fields(cycle),
+    )
+
+
+def _recovery_row(recovery: dict) -> tuple:
+    score = recovery.get("score") or {}
+    return (
+        recovery["cycle_id"],
+        recovery["sleep_id"],
+        recovery["user_id"],
+        recovery["created_at"],
+        recovery["updated_at"],
+        recovery["score_state"],
+        1 if score.get("user_calibrating") else 0,
+        score.get("recovery_score"),
+        score.get("resting_heart_rate"),
+        score.get("hrv_rmssd_milli"),
+        score.get("spo2_percentage"),
+        score.get("skin_temp_celsius"),
+    )
+
+
+def _sleep_row(sleep: dict) -> tuple:
+    score = sleep.get("score") or {}
+    stage = score.get("stage_summary") or {}
+    return (
+        sleep["id"],
+        sleep.get("cycle_id"),
+        sleep["user_id"],
+        sleep["created_at"],
+        sleep["updated_at"],
+        sleep["start"],
+        sleep.get("end"),
+        sleep.get("timezone_offset"),
+        1 if sleep.get("nap") else 0,
+        sleep["score_state"],
+        stage.get("total_in_bed_time_milli"),
+        stage.get("total_awake_time_milli"),
+        stage.get("total_light_sleep_time_milli"),
+        stage.get("total_slow_wave_sleep_time_milli"),
+        stage.get("total_rem_sleep_time_milli"),
+        stage.get("sleep_cycle_count"),
+        stage.get("disturbance_count"),
+        score.get("respiratory_rate"),
+        score.get("sleep_performance_percentage"),
+        score.get("sleep_consistency_percentage"),
+        score.get("sleep_efficiency_percentage"),
+        *_time_fields(sleep),
+    )
+
+
+def _workout_row(workout: dict) -> tuple:
+    score = workout.get("score") or {}
+    zones = score.get("zone_durations") or {}
+    return (
+        workout["id"],
+        workout["user_id"],
+        workout["created_at"],
+        workout["updated_at"],
+        workout["start"],
+        workout.get("end"),
+        workout.get("timezone_offset"),
+        workout.get("sport_name"),
+        workout.get("sport_id"),
+        workout["score_state"],
+        score.get("strain"),
+        score.get("average_heart_rate"),
+        score.get("max_heart_rate"),
+        score.get("kilojoule"),
+        score.get("percent_recorded"),
+        score.get("distance_meter"),
+        score.get("altitude_gain_meter"),
+        score.get("altitude_change_meter"),
+        zones.get("zone_zero_milli"),
+        zones.get("zone_one_milli"),
+        zones.get("zone_two_milli"),
+        zones.get("zone_three_milli"),
+        zones.get("zone_four_milli"),
+        zones.get("zone_five_milli"),
+        *_time_fields(workout),
+    )
+
+
+def _tune(conn: sqlite3.Connection):
+    conn.execute(f"PRAGMA cache_size = -{config.db_cache_kb}")
+    conn.execute(f"PRAGMA mmap_size = {config.db_mmap_mb * 1024 * 1024}")
+
+
+def connect_readonly(db_path: str = None) -> sqlite3.Connection:
+    """Open a read-only connection for the dashboard.
+
+    With the database in WAL mode, readers see the last committed snapshot
+    and never block (or get blocked by) a running sync. Not shared between
+    threads at once; open one per session.
+    """
+    uri = Path(db_path or config.db_path).absolute().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(
+        uri, uri=True, timeout=config.db_busy_timeout, check_same_thread=False
+    )
+    _tune(conn)
+    return conn
+
+
+# Schema versions, applied in order and recorded in PRAGMA user_version so
+# opening an up-to-date database costs one integer check. Each step must be
+# safe to re-run on databases from before versioning. Append new steps;
+# never change one that has shipped.
+MIGRATIONS = (
+    (1, "_migrate_base"),
+    (2, "_migrate_time_columns"),
+    (3, "_migrate_derived_tables"),
+    (4, "_migrate_facts_user_index"),
+    (5, "_migrate_user_day_indexes"),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Rows per backfill transaction; also bounds SQL variables per statement.
+BACKFILL_BATCH = 1000
 
 
 class Database:
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, user_id: int = None):
         self.db_path = db_path or config.db_path
+        # Set when several accounts share one database: sync bookkeeping is
+        # then kept per user and queries only see this user's rows.
+        self.user_id = user_id
         self.conn = None
         self._init_db()
 
     def _get_conn(self) -> sqlite3.Connection:
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path)
+            self.conn = sqlite3.connect(self.db_path, timeout=config.db_busy_timeout)
             self.conn.row_factory = sqlite3.Row
+            # WAL lets the dashboard read while a sync writes. NORMAL only
+            # fsyncs at checkpoints: a power cut can lose the last commits,
+            # which the next incremental sync fetches again.
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.execute("PRAGMA synchronous = NORMAL")
+            _tune(self.conn)
         return self.conn
 
     def _init_db(self):
         conn = self._get_conn()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            self._migrate(conn, version)
+
+    def _migrate(self, conn: sqlite3.Connection, version: int):
+        for target, method in MIGRATIONS:
+            if target > version:
+                getattr(self, method)(conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+                conn.commit()
+
+    def _migrate_base(self, conn: sqlite3.Connection):
         conn.executescript(SCHEMA)
-        conn.commit()
+
+    def _migrate_time_columns(self, conn: sqlite3.Connection):
+        # IMMEDIATE so two processes upgrading at once can't both add a column.
+        conn.execute("BEGIN IMMEDIATE")
+        with conn:
+            for table in TIME_TABLES:
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for column, kind in TIME_COLUMNS.items():
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+        for table in TIME_TABLES:
+            filled = 0
+            for rows in self._batches(
+                conn,
+                f"SELECT rowid, start, end, timezone_offset FROM {table} "
+                "WHERE rowid > ? AND start_ms IS NULL AND start IS NOT NULL "
+                "ORDER BY rowid LIMIT ?",
+            ):
+                conn.executemany(
+                    f"UPDATE {table} SET start_ms = ?, end_ms = ?, day = ? WHERE rowid = ?",
+                    [(*_time_fields(dict(row)), row[0]) for row in rows],
+                )
+                filled += len(rows)
+            if filled:
+                print(f"Backfilled typed time columns for {filled} {table}")
+        conn.executescript(TIME_INDEXES)
+
+    def _migrate_derived_tables(self, conn: sqlite3.Connection):
+        conn.executescript(DERIVED_SCHEMA)
+        built = 0
+        for rows in self._batches(
+            conn, "SELECT id FROM cycles WHERE id > ? ORDER BY id LIMIT ?"
+        ):
+            self._refresh_facts(conn, [row["id"] for row in rows])
+            built += len(rows)
+        if built:
+            print(f"Built daily facts and rollups for {built} cycles")
+
+    def _migrate_facts_user_index(self, conn: sqlite3.Connection):
+        # Rollup refreshes look up one user's facts for a period.
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_daily_facts_user_day ON daily_facts(user_id, day)"
+        )
+
+    def _migrate_user_day_indexes(self, conn: sqlite3.Connection):
+        # Fact refreshes look up one user's cycles and workouts for a day;
+        # the day indexes alone grow with every account in the database.
+        conn.executescript(
+            """
+            CREATE INDEX IF NOT EXISTS idx_cycles_user_day ON cycles(user_id, day);
+            CREATE INDEX IF NOT EXISTS idx_workouts_user_day ON workouts(user_id, day);
+        """
+        )
+
+    def _batches(self, conn: sqlite3.Connection, sql: str):
+        """Yield rows of ``sql`` (params: last key, limit) a batch at a time,
+        each yielded inside its own transaction so a large backfill doesn't
+        hold the write lock throughout."""
+        last = 0
+        while True:
+            rows = conn.execute(sql, (last, BACKFILL_BATCH)).fetchall()
+            if not rows:
+                return
+            with conn:
+                yield rows
+            last = rows[-1][0]
 
     def close(self):
         if self.conn:
             self.conn.close()
             self.conn = None
 
-    def upsert_cycle(self, cycle: dict):
-        score = cycle.get("score") or {}
+    def _key(self, entity: str) -> str:
+        return entity if self.user_id is None else f"{entity}@{self.user_id}"
+
+    def _user_filter(self, column: str = "user_id", keyword: str = "AND") -> Tuple[str, tuple]:
+        if self.user_id is None:
+            return "", ()
+        return f" {keyword} {column} = ?", (self.user_id,)
+
+    def _write_page(
+        self,
+        entity: str,
+        records: List[dict],
+        rows: List[tuple],
+        checkpoint: tuple = None,
+        force: bool = False,
+        advance_watermark: bool = True,
+    ) -> int:
+        """Write a page in one transaction and return how many rows changed.
+
+        Only collection pages may pass ``advance_watermark``: records fetched
+        by id (webhooks, repair) can be newer than ones no poll has seen yet,
+        and the next incremental poll starts from the watermark.
+        """
+        if not rows and not checkpoint:
+            return 0
         conn = self._get_conn()
-        conn.execute(
-            """
-            INSERT OR REPLACE INTO cycles 
-            (id, user_id, created_at, updated_at, start, end, timezone_offset, 
-             score_state, strain, kilojoule, average_heart_rate, max_heart_rate)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-            (
-                cycle["id"],
-                cycle["user_id"],
-                cycle["created_at"],
-                cycle["updated_at"],
-                cycle["start"],
-                cycle.get("end"),
-                cycle.get("timezone_offset"),
-                cycle["score_state"],
-                score.get("strain"),
-                score.get("kilojoule"),
-                score.get("average_heart_rate"),
-                score.get("max_heart_rate"),
-            ),
+        written = 0
+        with conn:
+            if rows:
+                before = conn.total_changes
+                conn.executemany(UPSERTS[entity][force], rows)
+                written = conn.total_changes - before
+                if advance_watermark:
+                    self._save_watermark(conn, entity, records)
+                if written:
+                    self._refresh_facts(conn, self._fact_cycles(conn, entity, records))
+            if checkpoint:
+                self._save_checkpoint(conn, len(rows), *checkpoint)
+        return written
+
+    def upsert_cycles(
+        self,
+        cycles: List[dict],
+        checkpoint: tuple = None,
+        force: bool = False,
+        advance_watermark: bool = True,
+    ) -> int:
+        return self._write_page(
+            "cycles",
+            cycles,
+            [_cycle_row(c) for c in cycles],
+            checkpoint,
+            force,
+            advance_watermark,
         )
-        conn.commit()
 
-    def upsert_recovery(self, recovery: dict):
-        score = recovery.get("score") or {}
-        conn = self._get_conn()
+    def upsert_recoveries(
+        self,
+        recoveries: List[dict],
+        checkpoint: tuple = None,
+        force: bool = False,
+        advance_watermark: bool = True,
+    ) -> int:
+        return self._write_page(
+            "recoveries",
+            recoveries,
+            [_recovery_row(r) for r in recoveries],
+            checkpoint,
+            force,
+            advance_watermark,
+        )
+
+    def upsert_sleeps(
+        self,
+        sleeps: List[dict],
+        checkpoint: tuple = None,
+        force: bool = False,
+        advance_watermark: bool = True,
+    ) -> int:
+        return self._write_page(
+            "sleeps",
+            sleeps,
+            [_sleep_row(s) for s in sleeps],
+            checkpoint,
+            force,
+            advance_watermark,
+        )
+
+    def upsert_workouts(
+        self,
+        workouts: List[dict],
+        checkpoint: tuple = None,
+        force: bool = False,
+        advance_watermark: bool = True,
+    ) -> int:
+        return self._write_page(
+            "workouts",
+            workouts,
+            [_workout_row(w) for w in workouts],
+            checkpoint,
+            force,
+            advance_watermark,
+        )
+
+    def _save_watermark(
+        self, conn: sqlite3.Connection, entity: str, records: List[dict]
+    ):
+        if entity == "recoveries":
+            # Recoveries carry no start; the API filters them by their cycle's.
+            ids = [r["cycle_id"] for r in records]
+            row = conn.execute(
+                f"SELECT MAX(start) FROM cycles WHERE id IN ({','.join('?' * len(ids))})",
+                ids,
+            ).fetchone()
+            max_start = row[0]
+        else:
+            max_start = max(r["start"] for r in records)
+        max_updated_at = max(r["updated_at"] for r in records)
+
         conn.execute(
             """
-            INSERT OR REPLACE INTO recoveries 
-            (cycle_id, sleep_id, user_id, created_at, updated_at, score_state,
-             user_calibrating, recovery_score, resting_heart_rate, hrv_rmssd_milli,
-             spo2_percentage, skin_temp_celsius)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO sync_watermarks (entity, max_start, max_updated_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(entity) DO UPDATE SET
+                max_start = CASE
+                    WHEN excluded.max_start > COALESCE(max_start, '')
+                    THEN excluded.max_start ELSE max_start END,
+                max_updated_at = CASE
+                    WHEN excluded.max_updated_at > COALESCE(max_updated_at, '')
+                    THEN excluded.max_updated_at ELSE max_updated_at END
         """,
-            (
-                recovery["cycle_id"],
-                recovery["sleep_id"],
-                recovery["user_id"],
-                recovery["created_at"],
-                recovery["updated_at"],
-                recovery["score_state"],
-                1 if score.get("user_calibrating") else 0,
-                score.get("recovery_score"),
-                score.get("resting_heart_rate"),
-                score.get("hrv_rmssd_milli"),
-                score.get("spo2_percentage"),
-                score.get("skin_temp_celsius"),
-            ),
+            (self._key(entity), max_start, max_updated_at),
         )
-        conn.commit()
 
-    def upsert_sleep(self, sleep: dict):
-        score = sleep.get("score") or {}
-        stage = score.get("stage_summary") or {}
+    def get_watermark(self, entity: str) -> Optional[sqlite3.Row]:
         conn = self._get_conn()
+        return conn.execute(
+            "SELECT max_start, max_updated_at FROM sync_watermarks WHERE entity = ?",
+            (self._key(entity),),
+        ).fetchone()
+
+    def get_sync_start(self, entity: str) -> Optional[str]:
+        mark = self.get_watermark(entity)
+        if mark and mark["max_start"]:
+            return mark["max_start"]
+        # DBs written before watermarks existed: fall back to a one-off scan.
+        return {
+            "cycles": self.get_latest_cycle_date,
+            "recoveries": self.get_latest_recovery_date,
+            "sleeps": self.get_latest_sleep_date,
+            "workouts": self.get_latest_workout_date,
+        }[entity]()
+
+    def _save_checkpoint(
+        self,
+        conn: sqlite3.Connection,
+        rows: int,
+        entity: str,
+        window_start: str,
+        window_end: str,
+        next_token: Optional[str],
+    ):
         conn.execute(
             """
-            INSERT OR REPLACE INTO sleeps 
-            (id, cycle_id, user_id, created_at, updated_at, start, end, 
-             timezone_offset, nap, score_state, total_in_bed_time_milli,
-             total_awake_time_milli, total_light_sleep_time_milli,
-             total_slow_wave_sleep_time_milli, total_rem_sleep_time_milli,
-             sleep_cycle_count, disturbance_count, respiratory_rate,
-             sleep_performance_percentage, sleep_consistency_percentage,
-             sleep_efficiency_percentage)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            UPDATE sync_state
+            SET next_token = ?, rows = rows + ?, completed = ?, updated_at = ?
+            WHERE entity = ? AND window_start = ? AND window_end = ?
         """,
             (
-                sleep["id"],
-                sleep.get("cycle_id"),
-                sleep["user_id"],
-                sleep["created_at"],
-                sleep["updated_at"],
-                sleep["start"],
-                sleep.get("end"),
-                sleep.get("timezone_offset"),
-                1 if sleep.get("nap") else 0,
-                sleep["score_state"],
-                stage.get("total_in_bed_time_milli"),
-                stage.get("total_awake_time_milli"),
-                stage.get("total_light_sleep_time_milli"),
-                stage.get("total_slow_wave_sleep_time_milli"),
-                stage.get("total_rem_sleep_time_milli"),
-                stage.get("sleep_cycle_count"),
-                stage.get("disturbance_count"),
-                score.get("respiratory_rate"),
-                score.get("sleep_performance_percentage"),
-                score.get("sleep_consistency_percentage"),
-                score.get("sleep_efficiency_percentage"),
+                next_token,
+                rows,
+                0 if next_token else 1,
+                datetime.utcnow().isoformat(),
+                self._key(entity),
+                window_start,
+                window_end,
             ),
         )
-        conn.commit()
 
-    def upsert_workout(self, workout: dict):
-        score = workout.get("score") or {}
-        zones = score.get("zone_durations") or {}
+    def start_sync_windows(self, entity: str, windows: List[Tuple[str, str]]):
         conn = self._get_conn()
-        conn.execute(
+        with conn:
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO sync_state (entity, window_start, window_end, updated_at)
+                VALUES (?, ?, ?, ?)
+            """,
+                [
+                    (self._key(entity), w_start, w_end, datetime.utcnow().isoformat())
+                    for w_start, w_end in windows
+                ],
+            )
+
+    def get_sync_windows(self, entity: str) -> List[sqlite3.Row]:
+        conn = self._get_conn()
+        return conn.execute(
             """
-            INSERT OR REPLACE INTO workouts 
-            (id, user_id, created_at, updated_at, start, end, timezone_offset,
-             sport_name, sport_id, score_state, strain, average_heart_rate,
-             max_heart_rate, kilojoule, percent_recorded, distance_meter,
-             altitude_gain_meter, altitude_change_meter, zone_zero_milli,
-             zone_one_milli, zone_two_milli, zone_three_milli, zone_four_milli,
-             zone_five_milli)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            SELECT window_start, window_end, next_token, rows, completed
+            FROM sync_state WHERE entity = ?
+            ORDER BY window_start
         """,
-            (
-                workout["id"],
-                workout["user_id"],
-                workout["created_at"],
-                workout["updated_at"],
-                workout["start"],
-                workout.get("end"),
-                workout.get("timezone_offset"),
-                workout.get("sport_name"),
-                workout.get("sport_id"),
-                workout["score_state"],
-                score.get("strain"),
-                score.get("average_heart_rate"),
-                score.get("max_heart_rate"),
-                score.get("kilojoule"),
-                score.get("percent_recorded"),
-                score.get("distance_meter"),
-                score.get("altitude_gain_meter"),
-                score.get("altitude_change_meter"),
-                zones.get("zone_zero_milli"),
-                zones.get("zone_one_milli"),
-                zones.get("zone_two_milli"),
-                zones.get("zone_three_milli"),
-                zones.get("zone_four_milli"),
-                zones.get("zone_five_milli"),
-            ),
-        )
-        conn.commit()
+            (self._key(entity),),
+        ).fetchall()
+
+    def clear_sync_state(self, entity: str = None):
+        conn = self._get_conn()
+        with conn:
+            if entity:
+                conn.execute("DELETE FROM sync_state WHERE entity = ?", (self._key(entity),))
+            elif self.user_id is not None:
+                conn.execute(
+                    "DELETE FROM sync_state WHERE entity LIKE ?", (f"%@{self.user_id}",)
+                )
+            else:
+                conn.execute("DELETE FROM sync_state")
+
+    def delete_records(self, entity: str, ids: List[str]) -> int:
+        # Recoveries are deleted by the sleep they were scored from.
+        column = {"recoveries": "sleep_id"}.get(entity, "id")
+        conn = self._get_conn()
+        with conn:
+            records = [
+                dict(row)
+                for i in ids
+                for row in conn.execute(f"SELECT * FROM {entity} WHERE {column} = ?", (i,))
+            ]
+            affected = self._fact_cycles(conn, entity, records)
+            before = conn.total_changes
+            conn.executemany(
+                f"DELETE FROM {entity} WHERE {column} = ?", [(i,) for i in ids]
+            )
+            deleted = conn.total_changes - before
+            if entity == "cycles":
+                days = self._fact_days(conn, affected)
+                conn.executemany(
+                    "DELETE FROM daily_facts WHERE cycle_id = ?", [(c,) for c in affected]
+                )
+                self._refresh_rollups(conn, days)
+            else:
+                self._refresh_facts(conn, affected)
+            return deleted
+
+    def _fact_cycles(
+        self, conn: sqlite3.Connection, entity: str, records: List[dict]
+    ) -> List[int]:
+        """Cycles whose daily_facts row depends on these records."""
+        if entity == "cycles":
+            return [r["id"] for r in records]
+        if entity == "workouts":
+            # Only the owner's cycles on those days; other accounts sharing
+            # the database are unaffected.
+            user_days = {}
+            for r in records:
+                user_days.setdefault(r["user_id"], set()).add(
+                    _local_day(r["start"], r.get("timezone_offset"))
+                )
+            return [
+                row[0]
+                for user_id, days in user_days.items()
+                for row in conn.execute(
+                    f"SELECT id FROM cycles WHERE user_id IS ? AND day IN "
+                    f"({','.join('?' * len(days))})",
+                    (user_id, *days),
+                )
+            ]
+        return list({r["cycle_id"] for r in records if r.get("cycle_id") is not None})
+
+    def _fact_days(self, conn: sqlite3.Connection, cycle_ids: List[int]) -> set:
+        """(user_id, day) pairs of these cycles' facts."""
+        if not cycle_ids:
+            return set()
+        return {
+            (row[0], row[1])
+            for row in conn.execute(
+                f"SELECT DISTINCT user_id, day FROM daily_facts WHERE cycle_id IN "
+                f"({','.join('?' * len(cycle_ids))})",
+                list(cycle_ids),
+            )
+        }
+
+    def _refresh_facts(self, conn: sqlite3.Connection, cycle_ids: List[int]):
+        if cycle_ids:
+            where = f"c.id IN ({','.join('?' * len(cycle_ids))})"
+            conn.execute(_FACTS_SQL.format(where=where), list(cycle_ids) * 3)
+            self._refresh_rollups(conn, self._fact_days(conn, cycle_ids))
+
+    def _refresh_rollups(self, conn: sqlite3.Connection, user_days: set):
+        """Recompute the weekly and monthly rollups covering (user_id, day)
+        pairs. Other users sharing the database are left alone."""
+        periods = {
+            (resolution, period_start(resolution, day), user_id)
+            for user_id, day in user_days
+            if day
+            for resolution in ("week", "month")
+        }
+        for resolution, start, user_id in periods:
+            facts = conn.execute(
+                f"SELECT {', '.join(ROLLUP_METRICS)} FROM daily_facts "
+                "WHERE user_id IS ? AND day >= ? AND day < ?",
+                (user_id, start, _period_end(resolution, start)),
+            ).fetchall()
+
+            rows = []
+            for i, metric in enumerate(ROLLUP_METRICS):
+                values = [f[i] for f in facts if f[i] is not None]
+                if values:
+                    rows.append((resolution, start, user_id, metric, *_summaries(values)))
+            conn.execute(
+                "DELETE FROM rollups WHERE resolution = ? AND period = ? AND user_id IS ?",
+                (resolution, start, user_id),
+            )
+            conn.executemany(
+                "INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def upsert_cycle(self, cycle: dict):
+        self.upsert_cycles([cycle])
+
+    def upsert_recovery(self, recovery: dict):
+        self.upsert_recoveries([recovery])
+
+    def upsert_sleep(self, sleep: dict):
+        self.upsert_sleeps([sleep])
+
+    def upsert_workout(self, workout: dict):
+        self.upsert_workouts([workout])
 
     def upsert_profile(self, profile: dict):
         conn = self._get_conn()
@@ -204,33 +814,142 @@ class Database:
 
     def get_latest_cycle_date(self) -> Optional[str]:
         conn = self._get_conn()
-        row = conn.execute("SELECT MAX(start) FROM cycles").fetchone()
+        where, params = self._user_filter(keyword="WHERE")
+        row = conn.execute(f"SELECT MAX(start) FROM cycles{where}", params).fetchone()
         return row[0] if row and row[0] else None
 
     def get_latest_sleep_date(self) -> Optional[str]:
         conn = self._get_conn()
-        row = conn.execute("SELECT MAX(start) FROM sleeps").fetchone()
+        where, params = self._user_filter(keyword="WHERE")
+        row = conn.execute(f"SELECT MAX(start) FROM sleeps{where}", params).fetchone()
         return row[0] if row and row[0] else None
 
     def get_latest_workout_date(self) -> Optional[str]:
         conn = self._get_conn()
-        row = conn.execute("SELECT MAX(start) FROM workouts").fetchone()
+        where, params = self._user_filter(keyword="WHERE")
+        row = conn.execute(f"SELECT MAX(start) FROM workouts{where}", params).fetchone()
         return row[0] if row and row[0] else None
 
     def get_latest_recovery_date(self) -> Optional[str]:
         conn = self._get_conn()
-        row = conn.execute("""
+        where, params = self._user_filter("r.user_id", "WHERE")
+        row = conn.execute(f"""
             SELECT MAX(c.start) FROM recoveries r
-            JOIN cycles c ON r.cycle_id = c.id
-        """).fetchone()
+            JOIN cycles c ON r.cycle_id = c.id{where}
+        """, params).fetchone()
         return row[0] if row and row[0] else None
 
+    def get_repair_targets(self, since: str) -> Dict[str, List]:
+        conn = self._get_conn()
+        user, user_params = self._user_filter()
+        cycle_user, _ = self._user_filter("c.user_id")
+        since_ms = _epoch_ms(since)
+
+        def ids(sql):
+            return [row[0] for row in conn.execute(sql, (since_ms, *user_params)).fetchall()]
+
+        return {
+            "cycles": ids(
+                f"SELECT id FROM cycles WHERE score_state = 'PENDING_SCORE' AND start_ms >= ?{user}"
+            ),
+            "sleeps": ids(
+                f"SELECT id FROM sleeps WHERE score_state = 'PENDING_SCORE' AND start_ms >= ?{user}"
+            ),
+            "workouts": ids(
+                f"SELECT id FROM workouts WHERE score_state = 'PENDING_SCORE' AND start_ms >= ?{user}"
+            ),
+            "recoveries": ids(
+                f"""
+                SELECT c.id FROM cycles c
+                LEFT JOIN recoveries r ON r.cycle_id = c.id
+                WHERE c.start_ms >= ?{cycle_user}
+                  AND (r.cycle_id IS NULL OR r.score_state = 'PENDING_SCORE')
+            """
+            ),
+            "cycle_sleeps": ids(
+                f"""
+                SELECT c.id FROM cycles c
+                LEFT JOIN sleeps s ON s.cycle_id = c.id AND s.nap = 0
+                WHERE c.start_ms >= ?{cycle_user} AND s.id IS NULL
+            """
+            ),
+        }
+
+    def get_daily_density(self, label: str) -> Optional[float]:
+        # Recoveries have no start of their own; there is one per cycle.
+        table = "cycles" if label == "recoveries" else label
+        conn = self._get_conn()
+        where, params = self._user_filter(keyword="WHERE")
+        row = conn.execute(
+            f"""
+            SELECT COUNT(*), julianday(MAX(start)) - julianday(MIN(start))
+            FROM {table}{where}
+        """,
+            params,
+        ).fetchone()
+        count, span = row[0], row[1]
+        if not count or not span:
+            return None
+        return count / span
+
+    def record_sync_run(self, report: dict):
+        entities = report["entities"].values()
+        conn = self._get_conn()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO sync_runs
+                (mode, status, started_at, finished_at, wall_seconds, requests,
+                 bytes_received, rows_written, rows_skipped, report)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                (
+                    report["mode"],
+                    report["status"],
+                    report["started_at"],
+                    report["finished_at"],
+                    report["wall_seconds"],
+                    sum(e["requests"] for e in entities),
+                    sum(e["bytes_received"] for e in entities),
+                    sum(e["rows_written"] for e in entities),
+                    sum(e["rows_skipped"] for e in entities),
+                    json.dumps(report),
+                ),
+            )
+
+    def get_sync_runs(self, limit: int = 10) -> List[sqlite3.Row]:
+        conn = self._get_conn()
+        return conn.execute(
+            """
+            SELECT mode, status, started_at, wall_seconds, requests,
+                   bytes_received, rows_written, rows_skipped
+            FROM sync_runs ORDER BY id DESC LIMIT ?
+        """,
+            (limit,),
+        ).fetchall()
+
+    def get_last_success(self, mode: str) -> Optional[str]:
+        conn = self._get_conn()
+        row = conn.execute(
+            "SELECT MAX(started_at) FROM sync_runs WHERE mode = ? AND status = 'ok'",
+            (mode,),
+        ).fetchone()
+        return row[0]
+
+    def get_watermarks(self) -> Dict[str, sqlite3.Row]:
+        conn = self._get_conn()
+        rows = conn.execute(
+            "SELECT entity, max_start, max_updated_at FROM sync_watermarks"
+        ).fetchall()
+        return {row["entity"]: row for row in rows}
+
     def get_stats(self) -> dict:
         conn = self._get_conn()
         stats = {}
 
+        where, params = self._user_filter(keyword="WHERE")
         for table in ["cycles", "recoveries", "sleeps", "workouts"]:
-            row = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+            row = conn.execute(f"SELECT COUNT(*) FROM {table}{where}", params).fetchone()
             stats[table] = row[0]
 
         return stats
@@ -0,0 +1,395 @@
+"""Local stand-in for the Whoop API, generated from the bundled api.json.
+
+Serves the v2 collection and by-id endpoints with next_token pagination over
+records from synthetic.py, plus a stubbed OAuth flow, so syncs can be exercised and
+benchmarked offline:
+
+    python -m src.whoop_sync.fake_server --port 8765 --days 365
+    WHOOP_API_BASE_URL=http://localhost:8765 python main.py sync --full
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import random
+import re
+import secrets
+import threading
+import time
+import urllib.parse
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional
+
+from .synthetic import DEFAULT_END, generate_user
+
+SPEC_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "api.json")
+
+COLLECTIONS = {
+    "getCycleCollection": "cycles",
+    "getRecoveryCollection": "recoveries",
+    "getSleepCollection": "sleeps",
+    "getWorkoutCollection": "workouts",
+}
+
+ENTITY_TYPES = ["cycles", "recoveries", "sleeps", "workouts"]
+
+USER_TOKEN = re.compile(r"user-(\d+)")
+
+
+def load_spec(path: str = SPEC_PATH) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _parse_iso(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def example(spec: dict, schema: dict, rng: random.Random):
+    """Build a value for a schema, jittering the spec's numeric examples."""
+    if "$ref" in schema:
+        name = schema["$ref"].rsplit("/", 1)[-1]
+        schema = spec["components"]["schemas"][name]
+    if "enum" in schema:
+        return schema.get("example", schema["enum"][0])
+
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            name: example(spec, prop, rng)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        return [example(spec, schema.get("items", {}), rng)]
+    if kind == "number":
+        value = schema.get("example", 1.0) * rng.uniform(0.8, 1.2)
+        if "maximum" in schema:
+            value = min(value, schema["maximum"])
+        return round(value, 4)
+    if kind == "integer":
+        return int(schema.get("example", 1) * rng.uniform(0.8, 1.2))
+    if kind == "boolean":
+        return schema.get("example", False)
+    return schema.get("example", "")
+
+
+class FakeDataset:
+    """Records indexed the way the collection and by-id endpoints look them up."""
+
+    def __init__(self, spec: dict, records: Dict[str, List[Dict]]):
+        schemas = spec["components"]["schemas"]
+        rng = random.Random(0)
+        self.profile = example(spec, schemas["UserBasicProfile"], rng)
+        self.body_measurement = example(spec, schemas["UserBodyMeasurement"], rng)
+
+        cycle_starts = {c["id"]: c["start"] for c in records.get("cycles", [])}
+        self.collections = {}
+        for label in ENTITY_TYPES:
+            items = records.get(label, [])
+            if label == "recoveries":
+                # The recovery collection is filtered by its cycle's start.
+                keyed = [(cycle_starts.get(r["cycle_id"], r["created_at"]), r) for r in items]
+            else:
+                keyed = [(r["start"], r) for r in items]
+            # Newest first, like the real API.
+            keyed.sort(key=lambda item: item[0], reverse=True)
+            self.collections[label] = [(_parse_iso(key), record) for key, record in keyed]
+
+        self.cycles = {c["id"]: c for c in records.get("cycles", [])}
+        self.recoveries = {r["cycle_id"]: r for r in records.get("recoveries", [])}
+        self.sleeps = {s["id"]: s for s in records.get("sleeps", [])}
+        self.cycle_sleeps = {
+            s["cycle_id"]: s for s in records.get("sleeps", []) if not s.get("nap")
+        }
+        self.workouts = {w["id"]: w for w in records.get("workouts", [])}
+
+    def page(
+        self,
+        label: str,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        limit: int,
+        offset: int,
+    ) -> dict:
+        matching = [
+            record
+            for key, record in self.collections[label]
+            if (start is None or key >= start) and (end is None or key < end)
+        ]
+        records = matching[offset : offset + limit]
+        next_token = None
+        if offset + limit < len(matching):
+            next_token = base64.urlsafe_b64encode(str(offset + limit).encode()).decode()
+        return {"records": records, "next_token": next_token}
+
+
+class FakeOptions:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        per_minute: int = 0,
+        seed: int = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.per_minute = per_minute
+        self.rng = random.Random(seed)
+        self._window = int(time.time() // 60)
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def take_quota(self):
+        """Count a request against the per-minute quota; returns (remaining, reset)."""
+        with self._lock:
+            window = int(time.time() // 60)
+            if window != self._window:
+                self._window, self._used = window, 0
+            self._used += 1
+            reset = 60 - int(time.time() % 60)
+            return self.per_minute - self._used, reset
+
+
+class FakeWhoopHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    _rate_headers = {}
+
+    def _send(self, status: int, payload=None, headers: dict = None):
+        body = b"" if payload is None else json.dumps(payload).encode()
+        if len(body) > 1024 and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=1)
+            headers = dict(headers or {}, **{"Content-Encoding": "gzip"})
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject_faults(self) -> bool:
+        options = self.server.options
+        if options.latency or options.jitter:
+            time.sleep(max(0.0, options.latency + options.rng.uniform(-1, 1) * options.jitter))
+
+        headers = {}
+        if options.per_minute:
+            remaining, reset = options.take_quota()
+            headers = {
+                "X-RateLimit-Limit": options.per_minute,
+                "X-RateLimit-Remaining": max(remaining, 0),
+                "X-RateLimit-Reset": reset,
+            }
+            if remaining < 0:
+                self._send(429, {"error": "rate limited"}, dict(headers, **{"Retry-After": reset}))
+                return True
+
+        roll = options.rng.random()
+        if roll < options.throttle_rate:
+            self._send(429, {"error": "rate limited"}, dict(headers, **{"Retry-After": 1}))
+            return True
+        if roll < options.throttle_rate + options.error_rate:
+            self._send(500, {"error": "injected failure"})
+            return True
+        self._rate_headers = headers
+        return False
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        query = {k: v[0] for k, v in urllib.parse.parse_qs(url.query).items()}
+
+        if url.path == self.server.auth_path:
+            # Approve immediately and bounce back to the app's callback.
+            target = query.get("redirect_uri", "http://localhost:8080/callback")
+            params = urllib.parse.urlencode({"code": "fake-code", "state": query.get("state", "")})
+            self.send_response(302)
+            self.send_header("Location", f"{target}?{params}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if url.path == "/health":
+            self._send(200, {"status": "ok"})
+            return
+
+        for pattern, operation in self.server.routes:
+            match = pattern.fullmatch(url.path)
+            if match:
+                break
+        else:
+            self._send(404, {"error": "not found"})
+            return
+
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            self._send(401, {"error": "missing bearer token"})
+            return
+        if self._inject_faults():
+            return
+
+        try:
+            payload = self._dispatch(operation, match.groupdict(), query)
+        except (ValueError, KeyError):
+            self._send(400, {"error": "bad request"})
+            return
+        if payload is None:
+            self._send(404, {"error": "not found"})
+        else:
+            self._send(200, payload, self._rate_headers)
+
+    def _dataset(self) -> FakeDataset:
+        # Tokens minted as "user-<id>-..." select that user's data, so one
+        # server can stand in for many accounts.
+        match = USER_TOKEN.match(self.headers.get("Authorization", "")[len("Bearer "):])
+        if match:
+            return self.server.datasets.get(int(match.group(1)), self.server.dataset)
+        return self.server.dataset
+
+    def _dispatch(self, operation: str, path_params: dict, query: dict):
+        data = self._dataset()
+        if operation in COLLECTIONS:
+            limit = min(int(query.get("limit", 10)), 25)
+            token = query.get("nextToken")
+            offset = int(base64.urlsafe_b64decode(token).decode()) if token else 0
+            start = _parse_iso(query["start"]) if "start" in query else None
+            end = _parse_iso(query["end"]) if "end" in query else None
+            return data.page(COLLECTIONS[operation], start, end, limit, offset)
+
+        if operation == "getCycleById":
+            return data.cycles.get(int(path_params["cycleId"]))
+        if operation == "getRecoveryForCycle":
+            return data.recoveries.get(int(path_params["cycleId"]))
+        if operation == "getSleepForCycle":
+            return data.cycle_sleeps.get(int(path_params["cycleId"]))
+        if operation == "getSleepById":
+            return data.sleeps.get(path_params["sleepId"])
+        if operation == "getWorkoutById":
+            return data.workouts.get(path_params["workoutId"])
+        if operation == "getProfileBasic":
+            return data.profile
+        if operation == "getBodyMeasurement":
+            return data.body_measurement
+        return None
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = urllib.parse.parse_qs(self.rfile.read(length).decode())
+        if urllib.parse.urlparse(self.path).path != self.server.token_path:
+            self._send(404, {"error": "not found"})
+            return
+        # Refreshing a "user-<id>-" token keeps the user.
+        grant = (form.get("refresh_token") or form.get("code") or [""])[0]
+        match = USER_TOKEN.match(grant)
+        prefix = f"user-{match.group(1)}-" if match else ""
+        self._send(
+            200,
+            {
+                "access_token": prefix + secrets.token_urlsafe(24),
+                "refresh_token": prefix + secrets.token_urlsafe(24),
+                "expires_in": 3600,
+                "token_type": "bearer",
+            },
+        )
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _routes(spec: dict) -> list:
+    prefix = urllib.parse.urlparse(spec["servers"][0]["url"]).path.rstrip("/")
+    routes = []
+    for path, operations in spec["paths"].items():
+        if "get" not in operations:
+            continue
+        pattern = re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", prefix + path)
+        routes.append((re.compile(pattern), operations["get"]["operationId"]))
+    return routes
+
+
+def create_server(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    dataset: FakeDataset = None,
+    options: FakeOptions = None,
+    spec: dict = None,
+    datasets: Dict[int, FakeDataset] = None,
+) -> ThreadingHTTPServer:
+    spec = spec or load_spec()
+    server = ThreadingHTTPServer((host, port), FakeWhoopHandler)
+    server.daemon_threads = True
+    server.routes = _routes(spec)
+    flow = spec["components"]["securitySchemes"]["OAuth"]["flows"]["authorizationCode"]
+    server.auth_path = urllib.parse.urlparse(flow["authorizationUrl"]).path
+    server.token_path = urllib.parse.urlparse(flow["tokenUrl"]).path
+    server.dataset = dataset or FakeDataset(spec, generate_user(1, 365))
+    server.datasets = datasets or {}
+    server.options = options or FakeOptions()
+    return server
+
+
+def start_server(**kwargs) -> ThreadingHTTPServer:
+    """Run a fake server on a background thread; pass port=0 for a free port."""
+    server = create_server(**kwargs)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Whoop API locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--days", type=int, default=365, help="Days of data to serve")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--end", type=str, help=f"Last day of data (YYYY-MM-DD), default {DEFAULT_END:%Y-%m-%d}"
+    )
+    parser.add_argument("--user-id", type=int, default=1, help="First user_id")
+    parser.add_argument(
+        "--users", type=int, default=1, help="Users to serve, chosen by 'user-<id>-' tokens"
+    )
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument("--per-minute", type=int, default=0, help="Enforce a per-minute quota")
+    args = parser.parse_args()
+
+    spec = load_spec()
+    end = datetime.strptime(args.end, "%Y-%m-%d") if args.end else None
+    datasets = {
+        user_id: FakeDataset(spec, generate_user(user_id, args.days, args.seed, end))
+        for user_id in range(args.user_id, args.user_id + args.users)
+    }
+    records = datasets[args.user_id]
+    server = create_server(
+        args.host,
+        args.port,
+        records,
+        FakeOptions(
+            args.latency, args.jitter, args.error_rate, args.throttle_rate, args.per_minute, args.seed
+        ),
+        spec,
+        datasets,
+    )
+    print(
+        f"Fake Whoop API on http://{args.host}:{server.server_port} "
+        f"({args.users} users x {len(records.cycles)} cycles, {len(records.workouts)} workouts)"
+    )
+    print(f"  WHOOP_API_BASE_URL=http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Dict, List
+
+# Upper bounds (seconds) of the HTTP latency histogram buckets; the last
+# bucket counts everything slower.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class EntityMetrics:
+    requests: int = 0
+    http_seconds: float = 0.0
+    bytes_received: int = 0
+    latency_buckets: List[int] = field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1)
+    )
+    pages: int = 0
+    rows_written: int = 0
+    rows_skipped: int = 0
+    db_seconds: float = 0.0
+    wall_seconds: float = 0.0
+
+
+class SyncMetrics:
+    def __init__(self, mode: str = "sync"):
+        self.mode = mode
+        self.status = "running"
+        self.started_at = datetime.utcnow().isoformat()
+        self.finished_at = None
+        self.wall_seconds = 0.0
+        self.auth_seconds = 0.0
+        self.auth_refreshes = 0
+        self.entities: Dict[str, EntityMetrics] = {}
+        self._started = time.perf_counter()
+        self._entity_started: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _entity(self, label: str) -> EntityMetrics:
+        if label not in self.entities:
+            self.entities[label] = EntityMetrics()
+        return self.entities[label]
+
+    def record_request(self, label: str, seconds: float, nbytes: int):
+        with self._lock:
+            entity = self._entity(label or "other")
+            entity.requests += 1
+            entity.http_seconds += seconds
+            entity.bytes_received += nbytes
+            bucket = next(
+                (i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound),
+                len(LATENCY_BUCKETS),
+            )
+            entity.latency_buckets[bucket] += 1
+
+    def record_auth(self, seconds: float, refreshed: bool = False):
+        with self._lock:
+            self.auth_seconds += seconds
+            if refreshed:
+                self.auth_refreshes += 1
+
+    def record_write(self, label: str, rows: int, written: int, seconds: float):
+        with self._lock:
+            entity = self._entity(label)
+            entity.pages += 1
+            entity.rows_written += written
+            entity.rows_skipped += rows - written
+            entity.db_seconds += seconds
+
+    def start_entity(self, label: str):
+        with self._lock:
+            self._entity(label)
+            self._entity_started.setdefault(label, time.perf_counter())
+
+    def finish_entity(self, label: str):
+        with self._lock:
+            started = self._entity_started.pop(label, None)
+            if started is not None:
+                self._entity(label).wall_seconds += time.perf_counter() - started
+
+    def finish(self, status: str = "ok"):
+        self.status = status
+        self.finished_at = datetime.utcnow().isoformat()
+        self.wall_seconds = time.perf_counter() - self._started
+
+    def totals(self) -> EntityMetrics:
+        total = EntityMetrics()
+        for entity in self.entities.values():
+            total.requests += entity.requests
+            total.bytes_received += entity.bytes_received
+            total.pages += entity.pages
+            total.rows_written += entity.rows_written
+            total.rows_skipped += entity.rows_skipped
+            total.http_seconds += entity.http_seconds
+            total.db_seconds += entity.db_seconds
+        return total
+
+    def to_dict(self) -> dict:
+        return {
+            "mode": self.mode,
+            "status": self.status,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "auth_seconds": round(self.auth_seconds, 3),
+            "auth_refreshes": self.auth_refreshes,
+            "latency_buckets": list(LATENCY_BUCKETS),
+            "entities": {label: asdict(m) for label, m in self.entities.items()},
+        }
+
+    def write_json(self, path: str):
+        _atomic_write(path, json.dumps(self.to_dict(), indent=2))
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP whoop_sync_last_run_timestamp_seconds When the last sync finished.",
+            "# TYPE whoop_sync_last_run_timestamp_seconds gauge",
+            f"whoop_sync_last_run_timestamp_seconds {time.time():.0f}",
+            "# HELP whoop_sync_last_run_success Whether the last sync succeeded.",
+            "# TYPE whoop_sync_last_run_success gauge",
+            f"whoop_sync_last_run_success {1 if self.status == 'ok' else 0}",
+            "# HELP whoop_sync_run_seconds Wall time of the last sync.",
+            "# TYPE whoop_sync_run_seconds gauge",
+            f"whoop_sync_run_seconds {self.wall_seconds:.3f}",
+            "# HELP whoop_sync_auth_seconds Time spent obtaining access tokens.",
+            "# TYPE whoop_sync_auth_seconds gauge",
+            f"whoop_sync_auth_seconds {self.auth_seconds:.3f}",
+            "# HELP whoop_sync_auth_refreshes Token refreshes during the last sync.",
+            "# TYPE whoop_sync_auth_refreshes gauge",
+            f"whoop_sync_auth_refreshes {self.auth_refreshes}",
+        ]
+
+        gauges = [
+            ("requests", "HTTP requests made"),
+            ("bytes_received", "Response bytes received"),
+            ("pages", "Pages written"),
+            ("rows_written", "Rows inserted or updated"),
+            ("rows_skipped", "Rows skipped because they were unchanged"),
+            ("db_seconds", "Time spent writing to SQLite"),
+            ("wall_seconds", "Wall time per entity"),
+        ]
+        for name, help_text in gauges:
+            lines.append(f"# HELP whoop_sync_{name} {help_text} in the last sync.")
+            lines.append(f"# TYPE whoop_sync_{name} gauge")
+            for label, entity in self.entities.items():
+                lines.append(f'whoop_sync_{name}{{entity="{label}"}} {getattr(entity, name)}')
+
+        lines.append("# HELP whoop_sync_http_request_seconds HTTP latency in the last sync.")
+        lines.append("# TYPE whoop_sync_http_request_seconds histogram")
+        for label, entity in self.entities.items():
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), entity.latency_buckets):
+                cumulative += count
+                lines.append(
+                    f'whoop_sync_http_request_seconds_bucket{{entity="{label}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f'whoop_sync_http_request_seconds_sum{{entity="{label}"}} {entity.http_seconds:.3f}'
+            )
+            lines.append(
+                f'whoop_sync_http_request_seconds_count{{entity="{label}"}} {entity.requests}'
+            )
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        _atomic_write(path, self.to_prometheus())
+
+
+def _atomic_write(path: str, content: str):
+    # node_exporter's textfile collector may read at any moment; never let it
+    # see a half-written file.
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(content)
+    os.replace(tmp, path)
@@ -1,132 +1,23 @@
-import pandas as pd
-import numpy as np
 from sklearn.linear_model import Ridge
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import r2_score, mean_absolute_error
 
 
-def prepare_recovery_mlr_data(cycles_df, recoveries_df, sleeps_df, workouts_df):
-    main_sleeps = sleeps_df[sleeps_df["nap"] == 0]
-    df_mlr = (
-        cycles_df[["date", "strain", "id", "max_heart_rate"]]
-        .merge(
-            recoveries_df[
-                ["cycle_id", "recovery_score", "hrv_rmssd_milli", "resting_heart_rate"]
-            ],
-            left_on="id",
-            right_on="cycle_id",
-            how="inner",
-        )
-        .merge(
-            main_sleeps[
-                [
-                    "cycle_id",
-                    "total_slow_wave_sleep_time_milli",
-                    "total_rem_sleep_time_milli",
-                    "total_light_sleep_time_milli",
-                    "sleep_efficiency_percentage",
-                ]
-            ],
-            left_on="id",
-            right_on="cycle_id",
-            how="inner",
-        )
-    )
-
-    if not workouts_df.empty:
-        workout_dates = set(workouts_df["date"])
-        df_mlr["had_workout"] = df_mlr["date"].isin(workout_dates).astype(int)
-    else:
-        df_mlr["had_workout"] = 0
-
-    df_mlr["deep_sleep_hrs"] = df_mlr["total_slow_wave_sleep_time_milli"] / 3600000
-    df_mlr["rem_sleep_hrs"] = df_mlr["total_rem_sleep_time_milli"] / 3600000
-    df_mlr["total_sleep_hrs"] = (
-        df_mlr["total_slow_wave_sleep_time_milli"]
-        + df_mlr["total_rem_sleep_time_milli"]
-        + df_mlr["total_light_sleep_time_milli"]
-    ) / 3600000
+def _complete_days(facts_df):
+    # Cycles with both a recovery and a main sleep.
+    df = facts_df[facts_df["recovery_state"].notna() & facts_df["sleep_id"].notna()].copy()
+    df["date"] = df["day"]
+    return df
 
+
+def prepare_recovery_mlr_data(facts_df):
+    df_mlr = _complete_days(facts_df)
+    df_mlr["had_workout"] = (df_mlr["workout_count"] > 0).astype(int)
     return df_mlr
 
 
-def prepare_hrv_mlr_data(cycles_df, recoveries_df, sleeps_df, workouts_df):
-    main_sleeps = sleeps_df[sleeps_df["nap"] == 0]
-    df_mlr_hrv = (
-        cycles_df[
-            [
-                "date",
-                "strain",
-                "id",
-                "max_heart_rate",
-                "average_heart_rate",
-                "kilojoule",
-            ]
-        ]
-        .rename(columns={"strain": "day_strain"})
-        .merge(
-            recoveries_df[
-                [
-                    "cycle_id",
-                    "hrv_rmssd_milli",
-                    "resting_heart_rate",
-                    "spo2_percentage",
-                    "skin_temp_celsius",
-                ]
-            ],
-            left_on="id",
-            right_on="cycle_id",
-            how="inner",
-        )
-        .merge(
-            main_sleeps[
-                [
-                    "cycle_id",
-                    "total_slow_wave_sleep_time_milli",
-                    "total_rem_sleep_time_milli",
-                    "total_light_sleep_time_milli",
-                    "sleep_efficiency_percentage",
-                    "respiratory_rate",
-                    "sleep_consistency_percentage",
-                    "disturbance_count",
-                ]
-            ],
-            left_on="id",
-            right_on="cycle_id",
-            how="inner",
-        )
-    )
-
-    if not workouts_df.empty:
-        workout_agg = (
-            workouts_df.groupby("date")
-            .agg(
-                workout_strain=("strain", "sum"),
-                workout_kilojoule=("kilojoule", "sum"),
-                workout_count=("id", "count"),
-            )
-            .reset_index()
-        )
-        df_mlr_hrv = df_mlr_hrv.merge(workout_agg, on="date", how="left")
-        df_mlr_hrv["workout_strain"] = df_mlr_hrv["workout_strain"].fillna(0)
-        df_mlr_hrv["workout_kilojoule"] = df_mlr_hrv["workout_kilojoule"].fillna(0)
-        df_mlr_hrv["workout_count"] = df_mlr_hrv["workout_count"].fillna(0).astype(int)
-    else:
-        df_mlr_hrv["workout_strain"] = 0
-        df_mlr_hrv["workout_kilojoule"] = 0
-        df_mlr_hrv["workout_count"] = 0
-
-    df_mlr_hrv["deep_sleep_hrs"] = (
-        df_mlr_hrv["total_slow_wave_sleep_time_milli"] / 3600000
-    )
-    df_mlr_hrv["rem_sleep_hrs"] = df_mlr_hrv["total_rem_sleep_time_milli"] / 3600000
-    df_mlr_hrv["total_sleep_hrs"] = (
-        df_mlr_hrv["total_slow_wave_sleep_time_milli"]
-        + df_mlr_hrv["total_rem_sleep_time_milli"]
-        + df_mlr_hrv["total_light_sleep_time_milli"]
-    ) / 3600000
-
-    return df_mlr_hrv
+def prepare_hrv_mlr_data(facts_df):
+    return _complete_days(facts_df).rename(columns={"strain": "day_strain"})
 
 
 def fit_recovery_ridge_model(df_mlr, alpha=1.0):
@@ -18,6 +18,9 @@ class Cycle:
     kilojoule: float = None
     average_heart_rate: int = None
     max_heart_rate: int = None
+    start_ms: int = None
+    end_ms: int = None
+    day: str = None
 
 
 @dataclass
@@ -59,6 +62,9 @@ class Sleep:
     sleep_performance_percentage: float = None
     sleep_consistency_percentage: float = None
     sleep_efficiency_percentage: float = None
+    start_ms: int = None
+    end_ms: int = None
+    day: str = None
 
 
 @dataclass
@@ -87,6 +93,9 @@ class Workout:
     zone_three_milli: int = None
     zone_four_milli: int = None
     zone_five_milli: int = None
+    start_ms: int = None
+    end_ms: int = None
+    day: str = None
 
 
 @dataclass
@@ -104,6 +113,8 @@ class BodyMeasurement:
     max_heart_rate: int
 
 
+# Base tables (schema v1). Later changes are migrations in db.MIGRATIONS;
+# add a new one there rather than editing this.
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS cycles (
     id INTEGER PRIMARY KEY,
@@ -201,8 +212,113 @@ CREATE TABLE IF NOT EXISTS body_measurement (
     updated_at TEXT DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE TABLE IF NOT EXISTS sync_state (
+    entity TEXT,
+    window_start TEXT,
+    window_end TEXT,
+    next_token TEXT,
+    rows INTEGER DEFAULT 0,
+    completed INTEGER DEFAULT 0,
+    updated_at TEXT,
+    PRIMARY KEY (entity, window_start, window_end)
+);
+
+CREATE TABLE IF NOT EXISTS sync_watermarks (
+    entity TEXT PRIMARY KEY,
+    max_start TEXT,
+    max_updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS sync_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mode TEXT,
+    status TEXT,
+    started_at TEXT,
+    finished_at TEXT,
+    wall_seconds REAL,
+    requests INTEGER,
+    bytes_received INTEGER,
+    rows_written INTEGER,
+    rows_skipped INTEGER,
+    report TEXT
+);
+
 CREATE INDEX IF NOT EXISTS idx_cycles_start ON cycles(start);
 CREATE INDEX IF NOT EXISTS idx_sleeps_start ON sleeps(start);
 CREATE INDEX IF NOT EXISTS idx_workouts_start ON workouts(start);
 CREATE INDEX IF NOT EXISTS idx_recoveries_cycle_id ON recoveries(cycle_id);
 """
+
+# Typed time columns (schema v2). start_ms/end_ms are epoch milliseconds; day is the local calendar date
+# (YYYY-MM-DD) of start, shifted by the record's timezone_offset.
+TIME_COLUMNS = {"start_ms": "INTEGER", "end_ms": "INTEGER", "day": "TEXT"}
+TIME_TABLES = ("cycles", "sleeps", "workouts")
+
+TIME_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_cycles_start_ms ON cycles(start_ms);
+CREATE INDEX IF NOT EXISTS idx_cycles_day ON cycles(day);
+CREATE INDEX IF NOT EXISTS idx_sleeps_start_ms ON sleeps(start_ms);
+CREATE INDEX IF NOT EXISTS idx_sleeps_day ON sleeps(day);
+CREATE INDEX IF NOT EXISTS idx_workouts_start_ms ON workouts(start_ms);
+CREATE INDEX IF NOT EXISTS idx_workouts_day ON workouts(day);
+"""
+
+# Tables derived from the synced records (schema v3).
+DERIVED_SCHEMA = """
+-- One row per cycle joining its recovery, main sleep and that day's
+-- workouts; kept current by Database on every write.
+CREATE TABLE IF NOT EXISTS daily_facts (
+    cycle_id INTEGER PRIMARY KEY,
+    user_id INTEGER,
+    day TEXT,
+    strain REAL,
+    kilojoule REAL,
+    average_heart_rate INTEGER,
+    max_heart_rate INTEGER,
+    recovery_state TEXT,
+    recovery_score INTEGER,
+    resting_heart_rate INTEGER,
+    hrv_rmssd_milli REAL,
+    spo2_percentage REAL,
+    skin_temp_celsius REAL,
+    sleep_id TEXT,
+    light_sleep_hrs REAL,
+    deep_sleep_hrs REAL,
+    rem_sleep_hrs REAL,
+    total_sleep_hrs REAL,
+    awake_min REAL,
+    sleep_performance_percentage REAL,
+    sleep_efficiency_percentage REAL,
+    sleep_consistency_percentage REAL,
+    respiratory_rate REAL,
+    disturbance_count INTEGER,
+    workout_count INTEGER,
+    workout_strain REAL,
+    workout_kilojoule REAL,
+    zone_zero_milli INTEGER,
+    zone_one_milli INTEGER,
+    zone_two_milli INTEGER,
+    zone_three_milli INTEGER,
+    zone_four_milli INTEGER,
+    zone_five_milli INTEGER
+);
+
+-- Weekly ("week") and monthly ("month") summaries of daily_facts, one row
+-- per metric; period is the first day (Monday / the 1st) of the period.
+CREATE TABLE IF NOT EXISTS rollups (
+    resolution TEXT,
+    period TEXT,
+    user_id INTEGER,
+    metric TEXT,
+    mean REAL,
+    min REAL,
+    max REAL,
+    p10 REAL,
+    p90 REAL,
+    count INTEGER,
+    PRIMARY KEY (resolution, period, user_id, metric)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sleeps_cycle_id ON sleeps(cycle_id);
+CREATE INDEX IF NOT EXISTS idx_daily_facts_day ON daily_facts(day);
+"""
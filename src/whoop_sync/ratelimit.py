@@ -0,0 +1,165 @@
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional, Mapping
+
+from .config import config
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(wait, self.blocked_until - now)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def sync_remaining(self, remaining: int):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, remaining)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def check(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.cooldown:
+                raise CircuitOpenError(
+                    f"Circuit open after {self.failures} consecutive failures"
+                )
+            # Half-open: let requests through; the next failure re-opens it.
+            self.opened_at = None
+            self.failures = self.failure_threshold - 1
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+def _header_int(value: Optional[str]) -> Optional[int]:
+    # X-RateLimit-* values may carry policies, e.g. "100, 100;window=60".
+    if value is None:
+        return None
+    match = re.match(r"\s*(\d+)", value)
+    return int(match.group(1)) if match else None
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    def __init__(
+        self,
+        per_minute: int = None,
+        per_day: int = None,
+        max_retries: int = None,
+    ):
+        self.buckets = [
+            TokenBucket(per_minute or config.rate_limit_per_minute, 60),
+            TokenBucket(per_day or config.rate_limit_per_day, 86400),
+        ]
+        self.breaker = CircuitBreaker(
+            config.circuit_failure_threshold, config.circuit_cooldown
+        )
+        self.max_retries = config.max_retries if max_retries is None else max_retries
+
+    def wait_time(self) -> float:
+        self.breaker.check()
+        return max(bucket.reserve() for bucket in self.buckets)
+
+    def acquire(self):
+        wait = self.wait_time()
+        if wait > 0:
+            time.sleep(wait)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(config.backoff_cap, config.backoff_base * 2**attempt))
+
+    def _observe_headers(self, headers: Mapping[str, str]):
+        remaining = _header_int(headers.get("X-RateLimit-Remaining"))
+        if remaining is None:
+            return
+        self.buckets[0].sync_remaining(remaining)
+        if remaining == 0:
+            reset = _header_int(headers.get("X-RateLimit-Reset"))
+            self.buckets[0].pause(reset if reset is not None else 60)
+
+    def retry_delay(
+        self, status: int, headers: Mapping[str, str], attempt: int
+    ) -> Optional[float]:
+        """Return seconds to wait before retrying, or None if the response is final."""
+        self._observe_headers(headers)
+
+        if status not in RETRY_STATUSES:
+            self.breaker.record_success()
+            return None
+
+        self.breaker.record_failure()
+        if attempt >= self.max_retries:
+            return None
+
+        delay = _retry_after(headers.get("Retry-After"))
+        if delay is None:
+            delay = self._backoff(attempt)
+        if status == 429:
+            # Hold back every stream sharing this scheduler, not just this one.
+            self.buckets[0].pause(delay)
+        return delay
+
+    def error_delay(self, attempt: int) -> Optional[float]:
+        self.breaker.record_failure()
+        if attempt >= self.max_retries:
+            return None
+        return self._backoff(attempt)
@@ -1,29 +1,113 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Callable, Generator, List, Dict
+from typing import Optional, Callable, List, Tuple
+
+import requests
 
 from .auth import WhoopAuth
 from .api import WhoopAPI
+from .archive import RawArchive
+from .config import config
 from .db import Database
+from .metrics import SyncMetrics
+from .pipeline import prefetch
+from .ratelimit import RequestScheduler
+
+ENTITY_TYPES = ["cycles", "recoveries", "sleeps", "workouts"]
+
+_DONE = object()
+
+# (entity, window start, window end, pagination cursor to resume from)
+Stream = Tuple[str, Optional[datetime], Optional[datetime], Optional[str]]
+
+
+def _window_key(start: Optional[datetime], end: Optional[datetime]) -> Tuple[str, str]:
+    return (start.isoformat() if start else "", end.isoformat() if end else "")
+
+
+def _parse_window(value: str) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _get_or_none(get_one: Callable[..., dict], record_id) -> Optional[dict]:
+    try:
+        return get_one(record_id)
+    except requests.HTTPError as e:
+        # Not there yet (e.g. no recovery for today's cycle).
+        if e.response is not None and e.response.status_code == 404:
+            return None
+        raise
+
+
+def _print_synced(label: str, count: int, written: int):
+    print(f"  Synced {count} {label} ({written} written, {count - written} unchanged)")
 
 
 class WhoopSync:
-    def __init__(self):
-        self.auth = WhoopAuth()
+    def __init__(
+        self,
+        tokens_file: str = None,
+        db_path: str = None,
+        user_id: int = None,
+        scheduler: RequestScheduler = None,
+        archive_dir: str = None,
+    ):
+        self.auth = WhoopAuth(tokens_file)
         self.api = None
-        self.db = Database()
+        self.scheduler = scheduler
+        self.db = Database(db_path, user_id=user_id)
+        archive_dir = config.archive_dir if archive_dir is None else archive_dir
+        self.archive = RawArchive(archive_dir) if archive_dir else None
+        self.metrics = SyncMetrics()
 
     def authenticate(self) -> bool:
         if self.auth.load_tokens():
             if self.auth.is_authenticated():
-                self.api = WhoopAPI(self.auth)
+                self.api = WhoopAPI(self.auth, scheduler=self.scheduler)
+                self.api.metrics = self.metrics
                 return True
 
         if not self.auth.authorize():
             return False
 
-        self.api = WhoopAPI(self.auth)
+        self.api = WhoopAPI(self.auth, scheduler=self.scheduler)
+        self.api.metrics = self.metrics
         return True
 
+    def start_run(self, mode: str = "sync") -> SyncMetrics:
+        self.metrics = SyncMetrics(mode)
+        if self.api:
+            self.api.metrics = self.metrics
+        return self.metrics
+
+    def finish_run(
+        self, status: str = "ok", json_path: str = None, textfile_path: str = None
+    ) -> dict:
+        self.metrics.finish(status)
+        report = self.metrics.to_dict()
+        self.db.record_sync_run(report)
+
+        # None means use the configured paths; "" means write no file.
+        json_path = config.metrics_json if json_path is None else json_path
+        textfile_path = config.metrics_textfile if textfile_path is None else textfile_path
+        if json_path:
+            self.metrics.write_json(json_path)
+        if textfile_path:
+            self.metrics.write_prometheus(textfile_path)
+
+        totals = self.metrics.totals()
+        print(
+            f"\nRun {status} in {self.metrics.wall_seconds:.1f}s: "
+            f"{totals.requests} requests ({totals.http_seconds:.1f}s HTTP), "
+            f"{totals.rows_written} rows written ({totals.db_seconds:.1f}s SQLite), "
+            f"{self.metrics.auth_seconds:.1f}s auth"
+        )
+        return report
+
     def sync_profile(self):
         print("Syncing profile...")
         profile = self.api.get_profile()
@@ -31,6 +115,11 @@ class WhoopSync:
         print(f"  User: {profile.get('first_name')} {profile.get('last_name')}")
 
     def sync_body_measurement(self):
+        if self.db.user_id is not None:
+            # body_measurement holds a single row; accounts sharing the
+            # database would overwrite each other's.
+            print("Skipping body measurements (shared database)")
+            return
         print("Syncing body measurements...")
         measurement = self.api.get_body_measurement()
         self.db.upsert_body_measurement(measurement)
@@ -38,80 +127,474 @@ class WhoopSync:
             f"  Height: {measurement.get('height_meter')}m, Weight: {measurement.get('weight_kilogram')}kg"
         )
 
+    def _upsert_for(self, label: str) -> Callable[..., None]:
+        return {
+            "cycles": self.db.upsert_cycles,
+            "recoveries": self.db.upsert_recoveries,
+            "sleeps": self.db.upsert_sleeps,
+            "workouts": self.db.upsert_workouts,
+        }[label]
+
+    def _resolve_start(
+        self, label: str, start: datetime = None, full_sync: bool = False
+    ) -> Optional[datetime]:
+        # The collection endpoints only filter on start, inclusively, so
+        # starting at the newest start we hold re-reads just that record.
+        if not full_sync and start is None:
+            latest = self.db.get_sync_start(label)
+            if latest:
+                start = datetime.fromisoformat(latest.replace("Z", "+00:00"))
+        return start
+
+    def _plan(
+        self, label: str, windows: List[Tuple[Optional[datetime], Optional[datetime]]]
+    ) -> List[Stream]:
+        self.metrics.start_entity(label)
+        # A leftover plan means the last sync of this entity was interrupted;
+        # finish it from its saved cursors instead of starting a new one.
+        saved = self.db.get_sync_windows(label)
+        if saved:
+            pending = [row for row in saved if not row["completed"]]
+            print(
+                f"  Resuming {len(pending)} of {len(saved)} {label} windows "
+                f"from an interrupted sync"
+            )
+            return [
+                (
+                    label,
+                    _parse_window(row["window_start"]),
+                    _parse_window(row["window_end"]),
+                    row["next_token"],
+                )
+                for row in pending
+            ]
+
+        self.db.start_sync_windows(label, [_window_key(s, e) for s, e in windows])
+        return [(label, s, e, None) for s, e in windows]
+
+    def _store(
+        self,
+        label: str,
+        records: List[dict],
+        checkpoint: tuple = None,
+        advance_watermark: bool = True,
+    ) -> int:
+        if self.archive:
+            self.archive.append(label, records)
+        started = time.perf_counter()
+        written = self._upsert_for(label)(
+            records, checkpoint=checkpoint, advance_watermark=advance_watermark
+        )
+        self.metrics.record_write(
+            label, len(records), written, time.perf_counter() - started
+        )
+        return written
+
+    def _write_page(
+        self, stream: Stream, records: List[dict], next_token: Optional[str]
+    ) -> int:
+        label, start, end, _ = stream
+        return self._store(
+            label, records, checkpoint=(label, *_window_key(start, end), next_token)
+        )
+
     def _sync_entity(
         self,
         label: str,
-        get_latest_date: Callable[[], Optional[str]],
-        fetch: Callable[[Optional[datetime], Optional[datetime]], Generator[List[Dict], None, None]],
-        upsert: Callable[[dict], None],
         start: datetime = None,
         end: datetime = None,
         full_sync: bool = False,
     ):
-        if not full_sync and start is None:
-            latest = get_latest_date()
-            if latest:
-                start = datetime.fromisoformat(latest.replace("Z", "+00:00"))
-                start = start - timedelta(days=1)
+        start = self._resolve_start(label, start, full_sync)
 
         print(f"Syncing {label} from {start or 'beginning'}...")
-        count = 0
-        for records in fetch(start=start, end=end):
-            for record in records:
-                upsert(record)
-                count += 1
-        print(f"  Synced {count} {label}")
+        count = written = 0
+        for stream in self._plan(label, [(start, end)]):
+            # The next page downloads while this one is written.
+            pages = prefetch(self.api.fetch_pages(*stream), config.prefetch_depth)
+            for records, next_token in pages:
+                written += self._write_page(stream, records, next_token)
+                count += len(records)
+        self.db.clear_sync_state(label)
+        self.metrics.finish_entity(label)
+        _print_synced(label, count, written)
+
+    def _run_streams(self, streams: List[Stream], workers: int):
+        # Fetches run on the pool, which never outgrows the HTTP connection
+        # pool; every page is written from this thread, which owns the SQLite
+        # connection, so there is still exactly one writer.
+        workers = min(workers, self.api.pool_size)
+        pages = queue.Queue(maxsize=config.write_queue_size)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+
+        def produce(stream):
+            try:
+                for records, next_token in self.api.fetch_pages(*stream):
+                    if stop.is_set():
+                        break
+                    put((stream, records, next_token))
+            except Exception as e:
+                put((stream, e, None))
+            else:
+                put((stream, _DONE, None))
+
+        counts = {}
+        pending = {}
+        failed = set()
+        errors = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for stream in streams:
+                label = stream[0]
+                counts[label] = [0, 0]
+                pending[label] = pending.get(label, 0) + 1
+                pool.submit(produce, stream)
+
+            remaining = len(streams)
+            try:
+                while remaining:
+                    stream, item, next_token = pages.get()
+                    label = stream[0]
+                    if item is _DONE or isinstance(item, Exception):
+                        remaining -= 1
+                        pending[label] -= 1
+                        if not pending[label]:
+                            self.metrics.finish_entity(label)
+                        if item is not _DONE:
+                            failed.add(label)
+                            errors.append(item)
+                            print(f"  Failed to sync {label}: {item}")
+                        if not pending[label] and label not in failed:
+                            self.db.clear_sync_state(label)
+                            _print_synced(label, *counts[label])
+                    else:
+                        counts[label][1] += self._write_page(stream, item, next_token)
+                        counts[label][0] += len(item)
+            finally:
+                stop.set()
+
+        if errors:
+            raise errors[0]
+
+    def _sync_concurrently(
+        self,
+        labels: List[str],
+        start: datetime = None,
+        end: datetime = None,
+        full_sync: bool = False,
+        workers: int = 4,
+    ):
+        streams = []
+        for label in labels:
+            stream_start = self._resolve_start(label, start, full_sync)
+            print(f"Syncing {label} from {stream_start or 'beginning'}...")
+            streams.extend(self._plan(label, [(stream_start, end)]))
+        self._run_streams(streams, workers)
+
+    def _shard_windows(
+        self, label: str, start: datetime = None, end: datetime = None
+    ) -> List[Tuple[datetime, datetime]]:
+        start = start or datetime.fromisoformat(config.backfill_start)
+        end = end or datetime.utcnow()
+
+        # Size windows so each one is roughly shard_pages pages long, based on
+        # how many records per day this entity already has in the DB.
+        density = self.db.get_daily_density(label)
+        if density:
+            days = config.shard_pages * 25 / density
+            days = max(config.shard_min_days, min(days, config.shard_max_days))
+        else:
+            days = config.shard_days
+        size = timedelta(days=days)
+
+        windows = []
+        while start < end:
+            windows.append((start, min(start + size, end)))
+            start += size
+        return windows
+
+    def _find_data_start(self, end: datetime) -> datetime:
+        """Binary-search (with one-record range queries) for the latest time
+        before the account's first cycle, to within shard_min_days."""
+        low = datetime.fromisoformat(config.backfill_start)
+        high = end
+        if not self.api.has_records("cycles", low, high):
+            return high
+        while high - low > timedelta(days=config.shard_min_days):
+            mid = low + (high - low) / 2
+            if self.api.has_records("cycles", low, mid):
+                high = mid
+            else:
+                low = mid
+        # A day of slack for sleeps starting just ahead of their cycle.
+        return max(low - timedelta(days=1), datetime.fromisoformat(config.backfill_start))
+
+    def _sync_sharded(
+        self,
+        labels: List[str],
+        start: datetime = None,
+        end: datetime = None,
+        workers: int = 4,
+    ):
+        # Without an explicit start, shards would cover everything since
+        # backfill_start, mostly empty for all but the oldest accounts.
+        # Resumed plans keep their saved windows, so skip the probe for them.
+        if start is None and any(not self.db.get_sync_windows(label) for label in labels):
+            end = end or datetime.utcnow()
+            start = self._find_data_start(end)
+            print(f"Sharding from {start:%Y-%m-%d} (first data found)")
+
+        streams = []
+        for label in labels:
+            planned = self._plan(label, self._shard_windows(label, start, end))
+            print(f"Syncing {label} in {len(planned)} windows...")
+            streams.extend(planned)
+        self._run_streams(streams, workers)
 
     def sync_cycles(self, start: datetime = None, end: datetime = None, full_sync: bool = False):
-        self._sync_entity(
-            "cycles",
-            self.db.get_latest_cycle_date,
-            self.api.get_cycles,
-            self.db.upsert_cycle,
-            start=start, end=end, full_sync=full_sync,
-        )
+        self._sync_entity("cycles", start=start, end=end, full_sync=full_sync)
 
     def sync_recoveries(self, start: datetime = None, end: datetime = None, full_sync: bool = False):
-        self._sync_entity(
-            "recoveries",
-            self.db.get_latest_recovery_date,
-            self.api.get_recoveries,
-            self.db.upsert_recovery,
-            start=start, end=end, full_sync=full_sync,
-        )
+        self._sync_entity("recoveries", start=start, end=end, full_sync=full_sync)
 
     def sync_sleeps(self, start: datetime = None, end: datetime = None, full_sync: bool = False):
-        self._sync_entity(
-            "sleeps",
-            self.db.get_latest_sleep_date,
-            self.api.get_sleeps,
-            self.db.upsert_sleep,
-            start=start, end=end, full_sync=full_sync,
-        )
+        self._sync_entity("sleeps", start=start, end=end, full_sync=full_sync)
 
     def sync_workouts(self, start: datetime = None, end: datetime = None, full_sync: bool = False):
-        self._sync_entity(
-            "workouts",
-            self.db.get_latest_workout_date,
-            self.api.get_workouts,
-            self.db.upsert_workout,
-            start=start, end=end, full_sync=full_sync,
-        )
+        self._sync_entity("workouts", start=start, end=end, full_sync=full_sync)
+
+    def repair(self, days: int = None, workers: int = 4):
+        since = datetime.utcnow() - timedelta(days=days or config.repair_days)
+        targets = self.db.get_repair_targets(since.strftime("%Y-%m-%dT%H:%M:%S.000Z"))
+
+        # (entity the result is written as, by-id fetch, id)
+        lookups = {
+            "cycles": ("cycles", self.api.get_cycle),
+            "sleeps": ("sleeps", self.api.get_sleep),
+            "workouts": ("workouts", self.api.get_workout),
+            "recoveries": ("recoveries", self.api.get_cycle_recovery),
+            "cycle_sleeps": ("sleeps", self.api.get_cycle_sleep),
+        }
+        tasks = [
+            (lookups[kind][0], lookups[kind][1], record_id)
+            for kind, record_ids in targets.items()
+            for record_id in record_ids
+        ]
+        print(f"Repairing {len(tasks)} pending or incomplete records...")
+        if not tasks:
+            return
+
+        def fetch(task):
+            label, get_one, record_id = task
+            return label, _get_or_none(get_one, record_id)
+
+        found = {label: [] for label in ENTITY_TYPES}
+        with ThreadPoolExecutor(max_workers=min(workers, self.api.pool_size)) as pool:
+            for label, record in pool.map(fetch, tasks):
+                if record:
+                    found[label].append(record)
+
+        for label in ENTITY_TYPES:
+            if found[label]:
+                # Fetched by id, not paged: leave the poll's watermark alone.
+                written = self._store(label, found[label], advance_watermark=False)
+                _print_synced(label, len(found[label]), written)
+        missing = len(tasks) - sum(len(records) for records in found.values())
+        print(f"  {missing} records not available yet")
+
+    def apply_events(self, events: List[Tuple[str, str, str]]):
+        """Fetch and store exactly the records named by (label, id, action) events."""
+        found = {label: [] for label in ENTITY_TYPES}
+        deleted = {label: [] for label in ENTITY_TYPES}
+        cycle_ids = set()
+
+        for label, record_id, action in events:
+            if action == "deleted":
+                deleted[label].append(record_id)
+            elif label == "cycles":
+                cycle_ids.add(int(record_id))
+            elif label == "recoveries":
+                # Recovery events carry the sleep id; the recovery itself is
+                # fetched through that sleep's cycle, whose strain moves too.
+                sleep = _get_or_none(self.api.get_sleep, record_id)
+                if sleep:
+                    found["sleeps"].append(sleep)
+                    cycle_ids.add(sleep["cycle_id"])
+                    recovery = _get_or_none(self.api.get_cycle_recovery, sleep["cycle_id"])
+                    if recovery:
+                        found["recoveries"].append(recovery)
+            else:
+                get_one = self.api.get_sleep if label == "sleeps" else self.api.get_workout
+                record = _get_or_none(get_one, record_id)
+                if record:
+                    found[label].append(record)
+
+        for cycle_id in cycle_ids:
+            cycle = _get_or_none(self.api.get_cycle, cycle_id)
+            if cycle:
+                found["cycles"].append(cycle)
+
+        for label in ENTITY_TYPES:
+            if found[label]:
+                # Fetched by id, not paged: leave the poll's watermark alone.
+                written = self._store(label, found[label], advance_watermark=False)
+                _print_synced(label, len(found[label]), written)
+            # Only trust a delete the API confirms: the record must be gone.
+            gone = [record_id for record_id in deleted[label] if self._gone(label, record_id)]
+            if gone:
+                removed = self.db.delete_records(label, gone)
+                print(f"  Deleted {removed} {label}")
+            if len(gone) < len(deleted[label]):
+                kept = len(deleted[label]) - len(gone)
+                print(f"  Ignored {kept} {label} deletes for records that still exist")
+
+    def _gone(self, label: str, record_id: str) -> bool:
+        if label == "recoveries":
+            # Deleted recoveries are named by their sleep id.
+            sleep = _get_or_none(self.api.get_sleep, record_id)
+            return sleep is None or (
+                _get_or_none(self.api.get_cycle_recovery, sleep["cycle_id"]) is None
+            )
+        get_one = {
+            "cycles": self.api.get_cycle,
+            "sleeps": self.api.get_sleep,
+            "workouts": self.api.get_workout,
+        }[label]
+        return _get_or_none(get_one, record_id) is None
+
+    def replay(self, types: List[str] = None, force: bool = False, batch_size: int = 500):
+        if not self.archive:
+            print("No archive configured (WHOOP_ARCHIVE_DIR is empty)")
+            return
+
+        # Cycles go first so recovery watermarks can resolve their cycle starts.
+        for label in [label for label in ENTITY_TYPES if label in (types or ENTITY_TYPES)]:
+            upsert_many = self._upsert_for(label)
+            print(f"Replaying {label} from {len(self.archive.segments(label))} segments...")
+            count = written = 0
+            batch = []
+            for records in prefetch(self.archive.read(label), config.prefetch_depth):
+                batch.extend(records)
+                if len(batch) >= batch_size:
+                    written += upsert_many(batch, force=force)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                written += upsert_many(batch, force=force)
+                count += len(batch)
+            _print_synced(label, count, written)
+
+    def sync_types(
+        self,
+        types: List[str],
+        full_sync: bool = False,
+        start: datetime = None,
+        end: datetime = None,
+        parallel: int = 1,
+        shards: int = 1,
+    ):
+        labels = [label for label in ENTITY_TYPES if label in types]
+        if full_sync and shards > 1:
+            self._sync_sharded(labels, start=start, end=end, workers=shards)
+            return
+
+        if parallel > 1 and len(labels) > 1:
+            self._sync_concurrently(
+                labels, start=start, end=end, full_sync=full_sync, workers=parallel
+            )
+            return
+
+        for label in labels:
+            self._sync_entity(label, start=start, end=end, full_sync=full_sync)
 
     def sync_all(
-        self, full_sync: bool = False, start: datetime = None, end: datetime = None
+        self,
+        full_sync: bool = False,
+        start: datetime = None,
+        end: datetime = None,
+        parallel: int = 1,
+        shards: int = 1,
     ):
         self.sync_profile()
         self.sync_body_measurement()
-        self.sync_cycles(start=start, end=end, full_sync=full_sync)
-        self.sync_recoveries(start=start, end=end, full_sync=full_sync)
-        self.sync_sleeps(start=start, end=end, full_sync=full_sync)
-        self.sync_workouts(start=start, end=end, full_sync=full_sync)
+        self.sync_types(
+            ENTITY_TYPES,
+            full_sync=full_sync,
+            start=start,
+            end=end,
+            parallel=parallel,
+            shards=shards,
+        )
+        if not full_sync:
+            self.repair()
+        self._print_stats()
 
+    def _print_stats(self):
         stats = self.db.get_stats()
         print(f"\nDatabase stats:")
         for table, count in stats.items():
             print(f"  {table}: {count} records")
 
+    async def _sync_entity_async(
+        self,
+        api,
+        label: str,
+        start: datetime = None,
+        end: datetime = None,
+        full_sync: bool = False,
+    ):
+        start = self._resolve_start(label, start, full_sync)
+
+        print(f"Syncing {label} from {start or 'beginning'}...")
+        count = written = 0
+        # Writes run on the event loop thread, which is the only SQLite writer.
+        for stream in self._plan(label, [(start, end)]):
+            async for records, next_token in api.fetch_pages(*stream):
+                written += self._write_page(stream, records, next_token)
+                count += len(records)
+        self.db.clear_sync_state(label)
+        self.metrics.finish_entity(label)
+        _print_synced(label, count, written)
+
+    async def sync_all_async(
+        self,
+        full_sync: bool = False,
+        start: datetime = None,
+        end: datetime = None,
+        types: List[str] = None,
+    ):
+        from .async_api import AsyncWhoopAPI
+
+        # Same steps as sync_all (or sync_types when types is given); only the
+        # paginated entity streams move onto the event loop.
+        if types is None:
+            self.sync_profile()
+            self.sync_body_measurement()
+
+        labels = [label for label in ENTITY_TYPES if label in (types or ENTITY_TYPES)]
+        async with AsyncWhoopAPI(self.auth, scheduler=self.scheduler) as api:
+            api.metrics = self.metrics
+            await asyncio.gather(
+                *(
+                    self._sync_entity_async(
+                        api, label, start=start, end=end, full_sync=full_sync
+                    )
+                    for label in labels
+                )
+            )
+
+        if types is None and not full_sync:
+            self.repair()
+        self._print_stats()
+
     def close(self):
+        if self.api:
+            self.api.close()
         self.db.close()
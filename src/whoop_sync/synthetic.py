@@ -0,0 +1,406 @@
+"""Deterministic synthetic Whoop data for benchmarks and load tests.
+
+The same seed, users, length and end date always give the same records.
+Data ends at DEFAULT_END unless --end is given, so output does not depend on
+the day it was generated.
+
+Each user gets their own baselines (HRV, resting heart rate, sleep need,
+training habits) and a day-by-day simulation in which strain raises the
+next night's sleep need, sleep performance and accumulated load drive HRV,
+and HRV, resting heart rate and sleep drive recovery, which in turn shapes
+how hard the user trains. Records use the API's JSON shapes, so they can go
+through the normal upserts or be served as API pages.
+
+    python -m src.whoop_sync.synthetic --users 100 --years 10 --db bench.db
+    python -m src.whoop_sync.synthetic --users 1 --years 2 --pages pages/
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Generator, Iterable
+
+from .db import Database
+
+ENTITY_TYPES = ["cycles", "recoveries", "sleeps", "workouts"]
+
+# Habits follow the weekday, so the end date shapes the records themselves;
+# a fixed default keeps a seed's data identical from one day to the next.
+DEFAULT_END = datetime(2026, 1, 1)
+
+# (sport_id, sport_name, typical strain, metres per minute or 0)
+SPORTS = [
+    (0, "running", 12.0, 170),
+    (1, "cycling", 11.0, 400),
+    (63, "walking", 6.0, 80),
+    (45, "weightlifting", 8.0, 0),
+    (48, "functional-fitness", 12.5, 0),
+    (44, "yoga", 5.0, 0),
+    (33, "swimming", 10.5, 40),
+    (52, "hiking", 9.0, 60),
+]
+
+TIMEZONES = ["-08:00", "-07:00", "-06:00", "-05:00", "+00:00", "+01:00", "+02:00", "+10:00"]
+
+HOUR_MS = 3_600_000
+
+
+def _iso(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def _offset(tz: str) -> timedelta:
+    sign = -1 if tz.startswith("-") else 1
+    hours, minutes = tz[1:].split(":")
+    return sign * timedelta(hours=int(hours), minutes=int(minutes))
+
+
+def _clip(value: float, low: float, high: float) -> float:
+    return max(low, min(high, value))
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _sleep_record(
+    rng: random.Random,
+    user_id: int,
+    cycle_id: int,
+    start: datetime,
+    in_bed_ms: float,
+    efficiency: float,
+    need_ms: float,
+    consistency: float,
+    tz: str,
+    nap: bool,
+) -> dict:
+    asleep = in_bed_ms * efficiency
+    slow_wave = asleep * rng.uniform(0.15, 0.25)
+    rem = asleep * rng.uniform(0.18, 0.26)
+    end = start + timedelta(milliseconds=in_bed_ms)
+    return {
+        "id": _uuid(rng),
+        "cycle_id": cycle_id,
+        "v1_id": None,
+        "user_id": user_id,
+        "created_at": _iso(end + timedelta(minutes=rng.randint(1, 30))),
+        "updated_at": _iso(end + timedelta(minutes=rng.randint(31, 90))),
+        "start": _iso(start),
+        "end": _iso(end),
+        "timezone_offset": tz,
+        "nap": nap,
+        "score_state": "SCORED",
+        "score": {
+            "stage_summary": {
+                "total_in_bed_time_milli": int(in_bed_ms),
+                "total_awake_time_milli": int(in_bed_ms - asleep),
+                "total_no_data_time_milli": 0,
+                "total_light_sleep_time_milli": int(asleep - slow_wave - rem),
+                "total_slow_wave_sleep_time_milli": int(slow_wave),
+                "total_rem_sleep_time_milli": int(rem),
+                "sleep_cycle_count": max(1, round(asleep / (90 * 60_000))),
+                "disturbance_count": rng.randint(0, 4) if nap else rng.randint(3, 18),
+            },
+            "sleep_needed": {
+                "baseline_milli": int(need_ms),
+                "need_from_sleep_debt_milli": 0,
+                "need_from_recent_strain_milli": 0,
+                "need_from_recent_nap_milli": 0,
+            },
+            "respiratory_rate": round(rng.gauss(15.5, 0.8), 4),
+            "sleep_performance_percentage": round(_clip(100 * asleep / need_ms, 1, 100)),
+            "sleep_consistency_percentage": round(consistency),
+            "sleep_efficiency_percentage": round(100 * efficiency, 4),
+        },
+    }
+
+
+def _workout_record(
+    rng: random.Random,
+    user_id: int,
+    start: datetime,
+    strain: float,
+    rhr: float,
+    max_hr: int,
+    tz: str,
+) -> dict:
+    sport_id, sport_name, typical, pace = rng.choice(SPORTS)
+    strain = _clip(strain * typical / 10, 2.0, 20.5)
+    minutes = _clip(rng.gauss(25 + 3.5 * strain, 10), 10, 240)
+    end = start + timedelta(minutes=minutes)
+    avg_hr = int(rhr + (max_hr - rhr) * _clip(0.35 + strain / 35, 0.3, 0.9))
+    zone_ms = minutes * 60_000
+    weights = [max(0.01, rng.gauss(w + strain / 40 * i, 0.05)) for i, w in enumerate([0.1, 0.3, 0.3, 0.2, 0.07, 0.03])]
+    total = sum(weights)
+    names = ["zero", "one", "two", "three", "four", "five"]
+    distance = pace * minutes * rng.uniform(0.8, 1.2)
+    return {
+        "id": _uuid(rng),
+        "v1_id": None,
+        "user_id": user_id,
+        "created_at": _iso(end + timedelta(minutes=rng.randint(1, 20))),
+        "updated_at": _iso(end + timedelta(minutes=rng.randint(21, 60))),
+        "start": _iso(start),
+        "end": _iso(end),
+        "timezone_offset": tz,
+        "sport_name": sport_name,
+        "score_state": "SCORED",
+        "score": {
+            "strain": round(strain, 4),
+            "average_heart_rate": avg_hr,
+            "max_heart_rate": int(_clip(avg_hr + rng.gauss(25, 8), avg_hr + 5, max_hr)),
+            "kilojoule": round(minutes * (8 + strain * 2.2) * rng.uniform(0.85, 1.15), 4),
+            "percent_recorded": 100.0,
+            "distance_meter": round(distance, 4) if pace else None,
+            "altitude_gain_meter": round(distance * rng.uniform(0, 0.02), 4) if pace else None,
+            "altitude_change_meter": round(rng.gauss(0, 3), 4) if pace else None,
+            "zone_durations": {
+                f"zone_{name}_milli": int(zone_ms * w / total) for name, w in zip(names, weights)
+            },
+        },
+        "sport_id": sport_id,
+    }
+
+
+def generate_user(
+    user_id: int, days: int, seed: int = 0, end: datetime = None
+) -> Dict[str, List[Dict]]:
+    """Simulate ``days`` of data for one user, ending at ``end``.
+
+    The same seed, user_id, days and end always produce the same records.
+    ``end`` defaults to DEFAULT_END; pass a recent date for data that reaches
+    up to today.
+    """
+    rng = random.Random(f"{seed}:{user_id}")
+    hrv_base = rng.uniform(30, 110)
+    rhr_base = rng.uniform(45, 68)
+    max_hr = int(rng.uniform(175, 200))
+    need_ms = rng.uniform(7.0, 8.8) * HOUR_MS
+    bedtime = rng.gauss(23.0, 0.8)
+    training = rng.uniform(0.3, 0.9)
+    nap_rate = rng.uniform(0.0, 0.12)
+    tz = rng.choice(TIMEZONES)
+    offset = _offset(tz)
+
+    end = end or DEFAULT_END
+    first_day = end - timedelta(days=days)
+    records = {label: [] for label in ENTITY_TYPES}
+
+    fitness = 0.0
+    hrv_noise = 0.0
+    prev_strain = 10.0
+    load = 10.0
+
+    def draw_onset(date: datetime) -> float:
+        return bedtime + (0.7 if date.weekday() >= 5 else 0) + rng.gauss(0, 0.5)
+
+    prev_onset = onset = draw_onset(first_day)
+
+    for day in range(days):
+        date = first_day + timedelta(days=day)
+        weekend = date.weekday() >= 5
+        cycle_id = user_id * 1_000_000 + day
+        current = day == days - 1
+
+        fitness = 0.995 * fitness + rng.gauss(0, 0.02)
+        hrv_noise = 0.6 * hrv_noise + rng.gauss(0, 0.08)
+        load = 0.85 * load + 0.15 * prev_strain
+
+        # Last night's sleep opens today's cycle.
+        sleep_start = date + timedelta(hours=onset) - offset
+        need = need_ms + 0.03 * HOUR_MS * (prev_strain - 10)
+        efficiency = _clip(rng.gauss(0.9, 0.03), 0.7, 0.99)
+        in_bed = _clip(rng.gauss(need / efficiency * (0.95 if weekend else 0.85), 0.7 * HOUR_MS), 3 * HOUR_MS, 12 * HOUR_MS)
+        consistency = _clip(100 - 35 * abs(onset - prev_onset) + rng.gauss(0, 5), 20, 100)
+        wake = sleep_start + timedelta(milliseconds=in_bed)
+        sleep = _sleep_record(
+            rng, user_id, cycle_id, sleep_start, in_bed, efficiency, need, consistency, tz, False
+        )
+        performance = sleep["score"]["sleep_performance_percentage"] / 100
+
+        hrv = hrv_base * math.exp(
+            0.35 * (performance - 0.9) - 0.025 * (load - 10) + 0.2 * fitness + hrv_noise
+        )
+        rhr = rhr_base - 6 * math.log(hrv / hrv_base) + 0.15 * (load - 10) + rng.gauss(0, 1)
+        logit = 3.0 * math.log(hrv / hrv_base) - 0.12 * (rhr - rhr_base) + 2.5 * (performance - 0.85) + 0.4
+        recovery_score = round(_clip(100 / (1 + math.exp(-logit)), 1, 99))
+
+        # Green days invite harder training.
+        workouts = []
+        if not current and rng.random() < training * (0.6 + 0.5 * recovery_score / 100) * (1.1 if weekend else 1.0):
+            intensity = rng.gauss(8 + 6 * recovery_score / 100 + 2 * fitness, 2)
+            workouts.append(
+                _workout_record(rng, user_id, wake + timedelta(hours=rng.uniform(1, 11)), intensity, rhr, max_hr, tz)
+            )
+            if rng.random() < 0.1:
+                workouts.append(
+                    _workout_record(rng, user_id, wake + timedelta(hours=rng.uniform(11, 13)), intensity * 0.6, rhr, max_hr, tz)
+                )
+
+        naps = []
+        if not current and rng.random() < nap_rate + (0.2 if performance < 0.7 else 0):
+            nap_start = sleep_start + timedelta(hours=rng.uniform(14, 17))
+            naps.append(
+                _sleep_record(
+                    rng, user_id, cycle_id, nap_start, rng.uniform(0.3, 1.5) * HOUR_MS,
+                    _clip(rng.gauss(0.85, 0.05), 0.5, 0.99), need, consistency, tz, True,
+                )
+            )
+
+        # Day strain compounds the workouts on top of everyday activity.
+        strain = rng.uniform(3, 8)
+        for workout in workouts:
+            workout_strain = workout["score"]["strain"]
+            strain = 21 * (1 - (1 - strain / 21) * (1 - workout_strain / 21))
+        strain = _clip(strain + rng.gauss(0, 0.5), 0.5, 21)
+        prev_strain = strain
+
+        # The cycle runs until the next sleep begins.
+        cycle_start = sleep_start
+        next_day = date + timedelta(days=1)
+        prev_onset, onset = onset, draw_onset(next_day)
+        cycle_end = next_day + timedelta(hours=onset) - offset
+        cycle = {
+            "id": cycle_id,
+            "user_id": user_id,
+            "created_at": _iso(cycle_start + timedelta(minutes=5)),
+            "updated_at": _iso(cycle_end + timedelta(minutes=rng.randint(5, 60))),
+            "start": _iso(cycle_start),
+            "end": _iso(cycle_end),
+            "timezone_offset": tz,
+            "score_state": "SCORED",
+            "score": {
+                "strain": round(strain, 4),
+                "kilojoule": round(rng.gauss(7000, 600) + 450 * strain, 4),
+                "average_heart_rate": int(rhr + 8 + 1.2 * strain + rng.gauss(0, 2)),
+                "max_heart_rate": int(_clip(120 + 3.2 * strain + rng.gauss(0, 5), 100, max_hr)),
+            },
+        }
+        recovery = {
+            "cycle_id": cycle_id,
+            "sleep_id": sleep["id"],
+            "user_id": user_id,
+            "created_at": sleep["created_at"],
+            "updated_at": _iso(wake + timedelta(minutes=rng.randint(30, 120))),
+            "score_state": "SCORED",
+            "score": {
+                "user_calibrating": day < 4,
+                "recovery_score": recovery_score,
+                "resting_heart_rate": round(rhr),
+                "hrv_rmssd_milli": round(hrv, 4),
+                "spo2_percentage": round(_clip(rng.gauss(96.5, 1.0), 90, 100), 4),
+                "skin_temp_celsius": round(rng.gauss(33.8, 0.4), 4),
+            },
+        }
+
+        if current:
+            # The open cycle: no end yet and scores still being computed.
+            del cycle["end"]
+            cycle["updated_at"] = cycle["created_at"]
+            for record in (cycle, recovery):
+                record["score_state"] = "PENDING_SCORE"
+                del record["score"]
+        elif rng.random() < 0.01:
+            recovery["score_state"] = "UNSCORABLE"
+            del recovery["score"]
+
+        records["cycles"].append(cycle)
+        records["recoveries"].append(recovery)
+        records["sleeps"].append(sleep)
+        records["sleeps"].extend(naps)
+        records["workouts"].extend(workouts)
+
+    return records
+
+
+def generate(
+    users: Iterable[int], days: int, seed: int = 0, end: datetime = None
+) -> Generator[Dict[str, List[Dict]], None, None]:
+    for user_id in users:
+        yield generate_user(user_id, days, seed, end)
+
+
+def api_pages(records: List[Dict], limit: int = 25) -> Generator[dict, None, None]:
+    """Split records into collection responses, newest first like the API."""
+    ordered = sorted(
+        records, key=lambda r: r.get("start") or r["created_at"], reverse=True
+    )
+    pages = max(1, math.ceil(len(ordered) / limit))
+    for index in range(pages):
+        yield {
+            "records": ordered[index * limit : (index + 1) * limit],
+            "next_token": f"page-{index + 2}" if index + 1 < pages else None,
+        }
+
+
+def write_database(db: Database, records: Dict[str, List[Dict]], batch_size: int = 500) -> int:
+    upserts = {
+        "cycles": db.upsert_cycles,
+        "recoveries": db.upsert_recoveries,
+        "sleeps": db.upsert_sleeps,
+        "workouts": db.upsert_workouts,
+    }
+    written = 0
+    for label in ENTITY_TYPES:
+        items = records[label]
+        for i in range(0, len(items), batch_size):
+            written += upserts[label](items[i : i + batch_size])
+    return written
+
+
+def write_pages(root: str, user_id: int, records: Dict[str, List[Dict]], limit: int = 25):
+    for label in ENTITY_TYPES:
+        directory = os.path.join(root, str(user_id), label)
+        os.makedirs(directory, exist_ok=True)
+        for index, page in enumerate(api_pages(records[label], limit), start=1):
+            with open(os.path.join(directory, f"page-{index:05d}.json"), "w") as f:
+                json.dump(page, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Whoop data")
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--first-user", type=int, default=1, help="First user_id")
+    parser.add_argument("--years", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--end",
+        type=str,
+        help=f"Last day (YYYY-MM-DD), default {DEFAULT_END:%Y-%m-%d}",
+    )
+    parser.add_argument("--db", type=str, help="Write into this SQLite database")
+    parser.add_argument("--pages", type=str, help="Write API page JSON files under this directory")
+    args = parser.parse_args()
+
+    if not args.db and not args.pages:
+        parser.error("pass --db and/or --pages")
+
+    end = datetime.strptime(args.end, "%Y-%m-%d") if args.end else None
+    days = int(args.years * 365)
+    db = Database(args.db) if args.db else None
+    totals = dict.fromkeys(ENTITY_TYPES, 0)
+    try:
+        users = range(args.first_user, args.first_user + args.users)
+        for user_id, records in zip(users, generate(users, days, args.seed, end)):
+            if db:
+                write_database(db, records)
+            if args.pages:
+                write_pages(args.pages, user_id, records)
+            for label in ENTITY_TYPES:
+                totals[label] += len(records[label])
+    finally:
+        if db:
+            db.close()
+
+    print(f"Generated {args.users} users x {days} days:")
+    for label, count in totals.items():
+        print(f"  {label}: {count} records")
+
+
+if __name__ == "__main__":
+    main()
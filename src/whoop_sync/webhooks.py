@@ -0,0 +1,159 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Tuple
+
+from .config import config
+
+# Webhook object types -> the entity their records are stored as.
+EVENT_LABELS = {
+    "cycle": "cycles",
+    "recovery": "recoveries",
+    "sleep": "sleeps",
+    "workout": "workouts",
+}
+
+# Reject signed events older than this, so captured requests can't be replayed.
+MAX_SIGNATURE_AGE = 300
+
+Event = Tuple[str, str, str]  # (label, record id, "updated" | "deleted")
+
+
+def sign(secret: str, timestamp: str, body: bytes) -> str:
+    digest = hmac.new(secret.encode(), timestamp.encode() + body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode()
+
+
+def parse_event(payload: dict) -> Event:
+    """Turn {"type": "sleep.updated", "id": ...} into an Event."""
+    kind, _, action = str(payload.get("type", "")).partition(".")
+    if kind not in EVENT_LABELS or action not in ("updated", "deleted"):
+        raise ValueError(f"Unsupported event type: {payload.get('type')!r}")
+    if payload.get("id") in (None, ""):
+        raise ValueError("Event has no id")
+    return EVENT_LABELS[kind], str(payload["id"]), action
+
+
+class EventQueue:
+    """Debounces and coalesces events per record.
+
+    Repeated events for one record collapse into one, released once the
+    record has been quiet for ``debounce`` seconds (or at most ``max_delay``
+    after its first event). A delete supersedes updates and vice versa;
+    the latest action wins.
+    """
+
+    def __init__(self, debounce: float = None, max_delay: float = None):
+        self.debounce = config.webhook_debounce if debounce is None else debounce
+        self.max_delay = max_delay or 4 * self.debounce
+        self._pending = {}
+        self._cond = threading.Condition()
+        self.received = 0
+        self.coalesced = 0
+
+    def add(self, label: str, record_id: str, action: str):
+        now = time.monotonic()
+        with self._cond:
+            self.received += 1
+            key = (label, record_id)
+            first_seen = now
+            if key in self._pending:
+                self.coalesced += 1
+                first_seen = self._pending[key][1]
+            due = min(now + self.debounce, first_seen + self.max_delay)
+            self._pending[key] = (due, first_seen, action)
+            self._cond.notify_all()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def take_due(self, timeout: float) -> List[Event]:
+        """Wait up to ``timeout`` seconds for events that are due and pop them."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                due = [key for key, (at, _, _) in self._pending.items() if at <= now]
+                if due:
+                    return [(*key, self._pending.pop(key)[2]) for key in due]
+                if now >= deadline:
+                    return []
+                next_due = min((at for at, _, _ in self._pending.values()), default=deadline)
+                self._cond.wait(max(0.0, min(deadline, next_due) - now))
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    events = None
+    secret = ""
+
+    def _respond(self, status: int, message: bytes = b""):
+        self.send_response(status)
+        self.send_header("Content-type", "application/json")
+        self.send_header("Content-Length", str(len(message)))
+        self.end_headers()
+        self.wfile.write(message)
+
+    def _verified(self, body: bytes) -> bool:
+        if not self.secret:
+            return False
+        signature = self.headers.get("X-WHOOP-Signature", "")
+        timestamp = self.headers.get("X-WHOOP-Signature-Timestamp", "")
+        try:
+            age = time.time() - int(timestamp) / 1000
+        except ValueError:
+            return False
+        if abs(age) > MAX_SIGNATURE_AGE:
+            return False
+        return hmac.compare_digest(signature, sign(self.secret, timestamp, body))
+
+    def do_POST(self):
+        if self.path != "/webhook":
+            self._respond(404)
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self._verified(body):
+            self._respond(401, b'{"error": "bad signature"}')
+            return
+        try:
+            payload = json.loads(body)
+            events = [parse_event(p) for p in (payload if isinstance(payload, list) else [payload])]
+        except ValueError as e:
+            self._respond(400, json.dumps({"error": str(e)}).encode())
+            return
+        for event in events:
+            self.events.add(*event)
+        self._respond(204)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._respond(200, b'{"status": "ok"}')
+        else:
+            self._respond(404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_webhook_server(
+    events: EventQueue, host: str = None, port: int = None, secret: str = None
+) -> ThreadingHTTPServer:
+    secret = config.webhook_secret if secret is None else secret
+    if not secret:
+        # Unsigned events could delete synced rows; never accept them.
+        raise ValueError("WHOOP_WEBHOOK_SECRET must be set to receive webhooks")
+    handler = type(
+        "BoundWebhookHandler", (WebhookHandler,), {"events": events, "secret": secret}
+    )
+    server = ThreadingHTTPServer(
+        (host or config.webhook_host, config.webhook_port if port is None else port), handler
+    )
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
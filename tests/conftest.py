@@ -0,0 +1,48 @@
+import json
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.whoop_sync import fake_server  # noqa: E402
+from src.whoop_sync.config import config  # noqa: E402
+from src.whoop_sync.sync import WhoopSync  # noqa: E402
+from src.whoop_sync.synthetic import generate_user  # noqa: E402
+
+END = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def records():
+    return generate_user(1, 30, 7, END)
+
+
+@pytest.fixture
+def server(monkeypatch, records):
+    spec = fake_server.load_spec()
+    server = fake_server.start_server(
+        port=0, spec=spec, dataset=fake_server.FakeDataset(spec, records)
+    )
+    server.spec = spec
+    monkeypatch.setattr(config, "api_base_url", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(config, "archive_dir", "")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sync(server, tmp_path):
+    tokens = tmp_path / "tokens.json"
+    tokens.write_text(
+        json.dumps(
+            {"access_token": "user-1-a", "refresh_token": "user-1-r", "expires_at": 9999999999}
+        )
+    )
+    sync = WhoopSync(tokens_file=str(tokens), db_path=str(tmp_path / "whoop.db"))
+    assert sync.authenticate()
+    yield sync
+    sync.close()
@@ -0,0 +1,17 @@
+from src.whoop_sync.daemon import SyncDaemon
+from src.whoop_sync.webhooks import EventQueue
+
+
+def test_events_wait_for_auth(sync):
+    events = EventQueue(debounce=0.01)
+    events.add("workouts", "w-1", "updated")
+    api, sync.api = sync.api, None
+
+    daemon = SyncDaemon(sync=sync, interval=1, events=events)
+    daemon._idle(0.2)
+    assert events.pending() == 1
+
+    sync.api = api
+    daemon._idle(0.2)
+    assert events.pending() == 0
+    assert daemon.events_applied == 1
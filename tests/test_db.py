@@ -0,0 +1,41 @@
+from src.whoop_sync.db import Database
+from src.whoop_sync.synthetic import generate_user, write_database
+
+from conftest import END
+
+
+def test_workout_write_leaves_other_users_facts_alone(tmp_path):
+    db = Database(str(tmp_path / "whoop.db"))
+    for user_id in (1, 2):
+        write_database(db, generate_user(user_id, 30, 7, END))
+    conn = db._get_conn()
+
+    # Mark user 2's derived rows; a refresh would overwrite the marks.
+    with conn:
+        conn.execute("UPDATE daily_facts SET strain = -1 WHERE user_id = 2")
+        conn.execute("UPDATE rollups SET mean = -1 WHERE user_id = 2")
+
+    row = conn.execute("SELECT id, day FROM workouts WHERE user_id = 1 LIMIT 1").fetchone()
+    shared_day = row["day"]
+    assert conn.execute(
+        "SELECT 1 FROM cycles WHERE user_id = 2 AND day = ?", (shared_day,)
+    ).fetchone()
+
+    user1 = generate_user(1, 30, 7, END)["workouts"]
+    changed = next(w for w in user1 if w["id"] == row["id"])
+    changed["updated_at"] = "2026-02-01T00:00:00.000Z"
+    changed["score"]["strain"] += 1
+    assert db.upsert_workouts([changed]) == 1
+
+    assert conn.execute(
+        "SELECT COUNT(*) FROM daily_facts WHERE user_id = 2 AND strain != -1"
+    ).fetchone()[0] == 0
+    assert conn.execute(
+        "SELECT COUNT(*) FROM rollups WHERE user_id = 2 AND mean != -1"
+    ).fetchone()[0] == 0
+    # The owner's day was refreshed.
+    assert conn.execute(
+        "SELECT workout_strain FROM daily_facts WHERE user_id = 1 AND day = ?",
+        (shared_day,),
+    ).fetchone()[0] > 0
+    db.close()
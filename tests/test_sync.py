@@ -0,0 +1,29 @@
+import copy
+import uuid
+
+from src.whoop_sync import fake_server
+
+
+def _workout_after(template: dict, day: str) -> dict:
+    workout = copy.deepcopy(template)
+    workout["id"] = str(uuid.uuid4())
+    for field in ("start", "end", "created_at", "updated_at"):
+        workout[field] = day + workout[field][10:]
+    return workout
+
+
+def test_event_for_newer_record_does_not_skip_older_ones(server, sync, records):
+    sync.sync_types(["workouts"])
+    latest = max(records["workouts"], key=lambda w: w["start"])
+
+    # Two workouts land after the last poll; only the newer one's event arrives.
+    missed = _workout_after(latest, "2026-01-03")
+    delivered = _workout_after(latest, "2026-01-05")
+    records["workouts"] += [missed, delivered]
+    server.dataset = fake_server.FakeDataset(server.spec, records)
+
+    sync.apply_events([("workouts", delivered["id"], "updated")])
+    sync.sync_types(["workouts"])
+
+    stored = {row[0] for row in sync.db._get_conn().execute("SELECT id FROM workouts")}
+    assert {missed["id"], delivered["id"]} <= stored